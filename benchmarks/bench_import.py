@@ -0,0 +1,106 @@
+"""
+启动耗时检查
+
+用python -X importtime测量各入口的导入耗时，并检查它们没有在导入时加载notion_client、requests、
+HTML解析器等重依赖(这些依赖只在创建DoubanAPI/NotionAPI时才导入)。每个入口在新的子进程中
+运行多轮，取最快一轮，扣除解释器自身启动的耗时。
+
+导入耗时超过--max-ms或加载了重依赖时返回非零退出码，可用于跟踪启动耗时的变化。
+
+用法:
+    python -m benchmarks.bench_import [--rounds 5] [--max-ms 100] [--json report.json]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+HEAVY_MODULES = ("notion_client", "httpx", "requests", "bs4", "lxml", "selectolax", "dotenv")
+
+# 入口名称 -> 解释器参数；这些入口都不应读取配置或连接网络
+TARGETS = {
+    "main.py --help": ["main.py", "--help"],
+    "import src.sync_service": ["-c", "import src.sync_service"],
+    "import src.douban_api": ["-c", "import src.douban_api"],
+    "import src.notion_api": ["-c", "import src.notion_api"],
+    "import src.models": ["-c", "import src.models"],
+}
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(args):
+    """
+    运行一次入口
+
+    Returns:
+        (顶层模块名 -> 累计导入耗时(微秒), 导入过的全部模块名)
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    top_level = {}
+    modules = set()
+    for line in process.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules.add(name)
+        if len(indent) <= 1:
+            top_level[name] = cumulative
+    return top_level, modules
+
+
+def best_of(args, rounds, baseline=None):
+    """多轮中最快一轮的导入耗时(毫秒，扣除baseline中解释器启动时就导入的模块)及导入的模块"""
+    best = float("inf")
+    modules = set()
+    for _ in range(rounds):
+        top_level, modules = measure(args)
+        total = sum(us for name, us in top_level.items() if name not in (baseline or ()))
+        best = min(best, total / 1000)
+    return best, modules
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="启动耗时检查")
+    arg_parser.add_argument("--rounds", type=int, default=5, help="每个入口运行的轮数")
+    arg_parser.add_argument("--max-ms", type=float, default=100, help="单个入口允许的最长导入耗时(毫秒)")
+    arg_parser.add_argument("--json", metavar="PATH", help="将结果写入JSON文件")
+    args = arg_parser.parse_args()
+
+    baseline, _ = measure(["-c", "pass"])
+    results = []
+    failed = False
+
+    print(f"{'入口':<26} {'导入耗时(ms)':>12}  重依赖")
+    print("-" * 60)
+    for label, target_args in TARGETS.items():
+        elapsed, modules = best_of(target_args, args.rounds, baseline)
+        heavy = sorted({name.split(".")[0] for name in modules if name.split(".")[0] in HEAVY_MODULES})
+        ok = elapsed <= args.max_ms and not heavy
+        failed = failed or not ok
+        results.append({"target": label, "import_ms": round(elapsed, 1), "heavy_modules": heavy, "ok": ok})
+        print(f"{label:<26} {elapsed:>12.1f}  {', '.join(heavy) or '-'}{'' if ok else '  ❌'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+
+    if failed:
+        print(f"\n❌ 有入口导入了重依赖或导入耗时超过{args.max_ms:g}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+DoubanMovie内存占用与序列化基准测试
+
+分别用__slots__实现的DoubanMovie和等价的普通类(每个实例一个__dict__、列表字段用list)
+构造一批电影，用tracemalloc统计每10k部电影占用的内存，并比较to_dict/from_dict的速度
+(耗时比小于1表示比旧模型快)以及canonical_json的速度。
+
+用法:
+    python -m benchmarks.bench_models [--count 10000] [--rounds 5]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from src.models import DoubanMovie
+
+
+class LegacyDoubanMovie:
+    """改用__slots__之前的电影模型，仅用于对比"""
+
+    def __init__(self, id, title, original_title, year, rating, genres, directors, casts, regions,
+                 release_date, duration, url, poster_url, summary,
+                 comment=None, rating_date=None, status="watched"):
+        self.id = id
+        self.title = title
+        self.original_title = original_title
+        self.year = year
+        self.rating = rating
+        self.genres = list(genres)
+        self.directors = list(directors)
+        self.casts = list(casts)
+        self.regions = list(regions)
+        self.release_date = release_date
+        self.duration = duration
+        self.url = url
+        self.poster_url = poster_url
+        self.summary = summary
+        self.comment = comment
+        self.rating_date = rating_date
+        self.status = status
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "original_title": self.original_title,
+            "year": self.year,
+            "rating": self.rating,
+            "genres": self.genres,
+            "directors": self.directors,
+            "casts": self.casts,
+            "regions": self.regions,
+            "release_date": self.release_date,
+            "duration": self.duration,
+            "url": self.url,
+            "poster_url": self.poster_url,
+            "summary": self.summary,
+            "comment": self.comment,
+            "rating_date": self.rating_date,
+            "status": self.status
+        }
+
+
+def make_records(count):
+    """生成字段取值接近真实数据的电影字典，字符串在两种模型间共用，只比较对象本身的开销"""
+    return [
+        {
+            "id": str(1000000 + i),
+            "title": f"电影{i} / Movie {i}",
+            "original_title": f"Movie {i}",
+            "year": str(1980 + i % 45),
+            "rating": (i % 10) / 2.0,
+            "genres": ["剧情", "爱情"],
+            "directors": [f"导演{i % 500}"],
+            "casts": [f"演员{i % 700}", f"演员{(i + 1) % 700}", f"演员{(i + 2) % 700}"],
+            "regions": ["中国大陆"],
+            "release_date": f"{1980 + i % 45}-01-01",
+            "duration": 90 + i % 60,
+            "url": f"https://movie.douban.com/subject/{1000000 + i}/",
+            "poster_url": f"https://img1.doubanio.com/view/photo/s_ratio_poster/public/p{i}.jpg",
+            "summary": "",
+            "comment": None,
+            "rating_date": "2024-01-01",
+            "status": "watched",
+        }
+        for i in range(count)
+    ]
+
+
+def measure_memory(cls, records):
+    """返回用records构造全部电影对象新增的内存字节数"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    movies = [cls(**record) for record in records]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del movies
+    return used
+
+
+def timed(func, rounds):
+    """返回多轮中最快一轮的耗时(秒)"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="DoubanMovie内存占用与序列化基准测试")
+    arg_parser.add_argument("--count", type=int, default=10000, help="构造的电影数量")
+    arg_parser.add_argument("--rounds", type=int, default=5, help="计时重复的轮数")
+    args = arg_parser.parse_args()
+
+    records = make_records(args.count)
+    scale = 10000 / args.count
+
+    print(f"电影数量: {args.count}")
+    print("-" * 60)
+
+    results = {}
+    for name, cls in (("dict", LegacyDoubanMovie), ("slots", DoubanMovie)):
+        used = measure_memory(cls, records)
+        movies = [cls(**record) for record in records]
+        dicts = [movie.to_dict() for movie in movies]
+        to_dict = timed(lambda: [movie.to_dict() for movie in movies], args.rounds)
+        if cls is DoubanMovie:
+            from_dict = timed(lambda: [DoubanMovie.from_dict(data) for data in dicts], args.rounds)
+        else:
+            # 旧模型没有from_dict，调用方直接用关键字参数构造
+            from_dict = timed(lambda: [LegacyDoubanMovie(**data) for data in dicts], args.rounds)
+        results[name] = (used, to_dict, from_dict)
+        print(f"{name:<6} 每10k部 {used * scale / 1024 / 1024:>7.2f} MB  "
+              f"单部 {used / args.count:>6.0f} B  to_dict {to_dict * 1e6 / args.count:>6.2f} µs/部  "
+              f"from_dict {from_dict * 1e6 / args.count:>6.2f} µs/部")
+
+    movies = [DoubanMovie(**record) for record in records]
+    dicts = [movie.to_dict() for movie in movies]
+    canonical = timed(lambda: [movie.canonical_json() for movie in movies], args.rounds)
+    print(f"slots  canonical_json {canonical * 1e6 / args.count:.2f} µs/部")
+
+    print("-" * 60)
+    legacy, slots = results["dict"], results["slots"]
+    print(f"内存节省: {1 - slots[0] / legacy[0]:.1%}  "
+          f"to_dict: 旧模型的{slots[1] / legacy[1]:.2f}倍耗时  from_dict: 旧模型的{slots[2] / legacy[2]:.2f}倍耗时")
+
+    if [DoubanMovie.from_dict(data).to_dict() for data in dicts] != dicts:
+        print("❌ from_dict(to_dict())未能还原原对象")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+豆瓣列表页解析器基准测试
+
+对benchmarks/fixtures下保存的豆瓣列表页(*_page.html)和详情页(*_detail.html)，
+分别用每个可用的解析器重复解析，输出每秒解析的电影条目数和详情页数，
+并确认所有解析器得到的DoubanMovie和详情数据完全一致。
+
+用法:
+    python -m benchmarks.bench_parsers [--rounds 200]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from src.parsers import available_backends, get_parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixtures(pattern):
+    """读取匹配的HTML样例"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, pattern))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    return fixtures
+
+
+def bench_backend(name, list_fixtures, detail_fixtures, rounds):
+    """返回(每秒列表条目数, 每秒详情页数, 各样例的解析结果)"""
+    parser = get_parser(name)
+    outputs = {
+        fixture: [movie.to_dict() for movie in parser.parse(html, "watched")[0]]
+        for fixture, html in list_fixtures.items()
+    }
+    outputs.update({
+        fixture: parser.parse_detail(html)
+        for fixture, html in detail_fixtures.items()
+    })
+    items_per_round = sum(len(outputs[fixture]) for fixture in list_fixtures)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in list_fixtures.values():
+            parser.parse(html, "watched")
+    items_per_sec = items_per_round * rounds / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in detail_fixtures.values():
+            parser.parse_detail(html)
+    details_per_sec = len(detail_fixtures) * rounds / (time.perf_counter() - start)
+
+    return items_per_sec, details_per_sec, outputs
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="豆瓣列表页解析器基准测试")
+    arg_parser.add_argument("--rounds", type=int, default=200, help="每个解析器重复解析的轮数")
+    args = arg_parser.parse_args()
+
+    list_fixtures = load_fixtures("*_page.html")
+    detail_fixtures = load_fixtures("*_detail.html")
+    if not list_fixtures or not detail_fixtures:
+        print(f"❌ 未找到HTML样例: {FIXTURES_DIR}")
+        return 1
+
+    backends = available_backends()
+    print(f"样例: {', '.join(list(list_fixtures) + list(detail_fixtures))}")
+    print(f"可用解析器: {', '.join(backends)}")
+    print("-" * 50)
+
+    reference_name = None
+    reference = None
+    consistent = True
+    for name in backends:
+        items_per_sec, details_per_sec, outputs = bench_backend(name, list_fixtures, detail_fixtures, args.rounds)
+        print(f"{name:<12} 列表页 {items_per_sec:>10,.0f} 条/秒  详情页 {details_per_sec:>8,.0f} 页/秒")
+
+        if reference is None:
+            reference_name, reference = name, outputs
+        elif outputs != reference:
+            consistent = False
+            print(f"❌ {name} 的解析结果与 {reference_name} 不一致")
+
+    print("-" * 50)
+    if consistent:
+        print("✅ 所有解析器输出一致")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
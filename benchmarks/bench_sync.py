@@ -0,0 +1,208 @@
+"""
+端到端同步基准测试(离线)
+
+在本地启动模拟的Notion接口和豆瓣列表页服务，分别以100/1k/10k部电影运行完整的SyncService，
+报告每种模式的耗时、豆瓣和Notion请求数、429次数以及峰值内存(RSS)。
+
+每次同步在独立的子进程中运行，峰值内存互不影响；模拟服务运行在父进程中，数据在同一规模的
+各次运行之间保留。
+
+模式:
+    full         空数据库全量同步，随后再全量同步一次(full-unchanged，无变化)
+    incremental  先完成一次增量同步建立水位线，再在列表最前面加入15部新电影后增量同步
+    multi        已看/想看/在看三个列表各占三分之一，一次全量同步
+
+用法:
+    python -m benchmarks.bench_sync [--sizes 100,1000,10000] [--modes full,incremental,multi]
+                                    [--notion-latency 0.02] [--rate-limit-ratio 0.01]
+                                    [--douban-block-ratio 0.05] [--json report.json]
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_services import FakeDoubanServer, FakeNotionServer
+
+NEW_MOVIES = 15
+
+
+def run_worker():
+    """子进程：对模拟服务运行一次SyncService，把结果写入BENCH_RESULT"""
+    from src.sync_service import SyncService
+
+    logging.getLogger("src.sync_service").setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    service = SyncService()
+    service.douban_api.BASE_URL = os.environ["BENCH_DOUBAN_URL"]
+    service.notion_api.notion = service.notion_api._create_client(base_url=os.environ["BENCH_NOTION_URL"])
+    stats = service.sync_movies()
+
+    result = {
+        "wall_time": time.perf_counter() - start,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stats": stats,
+    }
+    with open(os.environ["BENCH_RESULT"], "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+class Bench:
+    """管理模拟服务并在子进程中运行各个场景"""
+
+    def __init__(self, args):
+        self.args = args
+        self.notion = FakeNotionServer(
+            latency=args.notion_latency,
+            rate_limit_ratio=args.rate_limit_ratio,
+            retry_after=args.retry_after
+        ).start()
+        self.douban = FakeDoubanServer(latency=args.douban_latency, block_ratio=args.douban_block_ratio).start()
+        self.results = []
+
+    def close(self):
+        self.notion.stop()
+        self.douban.stop()
+
+    def reset(self, sizes):
+        """清空Notion数据库，重新生成豆瓣列表，返回新的状态目录"""
+        self.notion.reset()
+        self.douban.populate(sizes)
+        return tempfile.mkdtemp(prefix="bench_sync_")
+
+    def run(self, label, size, state_dir, statuses="watched", incremental=False, record=True):
+        """运行一次同步并记录请求数、耗时和峰值内存"""
+        self.notion.reset_counts()
+        self.douban.reset_counts()
+
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_path = f.name
+
+        env = dict(
+            os.environ,
+            DOUBAN_USER_ID="bench",
+            NOTION_API_KEY="bench",
+            NOTION_DATABASE_ID="fake-database",
+            NOTION_PARENT_PAGE_ID="",
+            SYNC_STATUS=statuses,
+            INCREMENTAL_SYNC="true" if incremental else "false",
+            STATE_DIR=state_dir,
+            HTTP_CACHE="false",
+            ENRICH_DETAILS="false",
+            MIRROR_MODE="false",
+            DOUBAN_MAX_PAGES="100000",
+            DOUBAN_RATE_LIMIT=str(self.args.douban_rate),
+            NOTION_RATE_LIMIT=str(self.args.notion_rate),
+            BENCH_NOTION_URL=self.notion.url,
+            BENCH_DOUBAN_URL=self.douban.url,
+            BENCH_RESULT=result_path,
+        )
+        process = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_sync", "--worker"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"{label} 运行失败:\n{process.stderr}")
+
+        with open(result_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        os.unlink(result_path)
+
+        notion_counts = dict(self.notion.counts)
+        row = {
+            "size": size,
+            "mode": label,
+            "wall_time": round(result["wall_time"], 2),
+            "douban_requests": sum(self.douban.counts.values()),
+            "douban_blocked": self.douban.counts.get("403", 0),
+            "notion_requests": sum(count for endpoint, count in notion_counts.items() if endpoint != "429"),
+            "notion_by_endpoint": notion_counts,
+            "rate_limited": notion_counts.get("429", 0),
+            "bytes": self.douban.bytes + self.notion.bytes,
+            "peak_rss_mb": round(result["peak_rss_mb"], 1),
+            "stats": result["stats"],
+        }
+        if record:
+            self.results.append(row)
+            self.print_row(row)
+        return row
+
+    def bench_full(self, size):
+        state_dir = self.reset({"watched": size})
+        self.run("full", size, state_dir)
+        self.run("full-unchanged", size, state_dir)
+
+    def bench_incremental(self, size):
+        state_dir = self.reset({"watched": size})
+        self.run("incremental-initial", size, state_dir, incremental=True, record=False)
+        self.douban.prepend("watched", NEW_MOVIES)
+        self.run(f"incremental+{NEW_MOVIES}", size, state_dir, incremental=True)
+
+    def bench_multi(self, size):
+        third = size // 3
+        state_dir = self.reset({"watched": size - 2 * third, "wish": third, "do": third})
+        self.run("multi", size, state_dir, statuses="watched,wish,do")
+
+    @staticmethod
+    def print_header():
+        print(f"{'规模':>6} {'模式':<18} {'耗时(秒)':>9} {'豆瓣请求':>8} {'Notion请求':>10} "
+              f"{'429':>5} {'传输(KB)':>9} {'峰值RSS(MB)':>11}  新增/更新/未变化")
+        print("-" * 100)
+
+    @staticmethod
+    def print_row(row):
+        stats = row["stats"]
+        print(f"{row['size']:>6} {row['mode']:<18} {row['wall_time']:>9.2f} {row['douban_requests']:>8} "
+              f"{row['notion_requests']:>10} {row['rate_limited']:>5} {row['bytes'] / 1024:>9.0f} "
+              f"{row['peak_rss_mb']:>11.1f}  "
+              f"{stats['added']}/{stats['updated']}/{stats.get('unchanged', 0)}")
+
+
+def main():
+    if "--worker" in sys.argv:
+        run_worker()
+        return 0
+
+    arg_parser = argparse.ArgumentParser(description="端到端同步基准测试(离线)")
+    arg_parser.add_argument("--sizes", default="100,1000,10000", help="电影数量，逗号分隔")
+    arg_parser.add_argument("--modes", default="full,incremental,multi", help="运行的模式，逗号分隔")
+    arg_parser.add_argument("--notion-latency", type=float, default=0.0, help="模拟Notion每个请求的延迟(秒)")
+    arg_parser.add_argument("--douban-latency", type=float, default=0.0, help="模拟豆瓣每个请求的延迟(秒)")
+    arg_parser.add_argument("--douban-block-ratio", type=float, default=0.0, help="豆瓣随机返回403的请求比例")
+    arg_parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Notion随机返回429的请求比例")
+    arg_parser.add_argument("--retry-after", type=float, default=0.1, help="429响应的Retry-After秒数")
+    arg_parser.add_argument("--notion-rate", type=float, default=1000, help="同步使用的NOTION_RATE_LIMIT")
+    arg_parser.add_argument("--douban-rate", type=float, default=1000, help="同步使用的DOUBAN_RATE_LIMIT")
+    arg_parser.add_argument("--json", metavar="PATH", help="将结果写入JSON文件")
+    args = arg_parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    modes = [mode.strip() for mode in args.modes.split(",")]
+
+    bench = Bench(args)
+    try:
+        Bench.print_header()
+        for size in sizes:
+            for mode in modes:
+                getattr(bench, f"bench_{mode}")(size)
+    finally:
+        bench.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(bench.results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
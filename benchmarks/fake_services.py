@@ -0,0 +1,330 @@
+"""
+离线基准测试使用的本地服务
+
+FakeNotionServer: 模拟同步用到的Notion REST接口(数据库查询/读取/更新/创建、页面创建/更新)，
+                  可配置每个请求的延迟和429注入比例，按接口统计请求数与传输字节数
+FakeDoubanServer: 生成豆瓣列表页，结构与benchmarks/fixtures下保存的真实页面一致，
+                  可配置随机返回403的比例，模拟豆瓣的反爬封禁
+
+两个服务都运行在后台线程中，同步代码通过真实的HTTP请求访问它们
+"""
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+LIST_PATHS = {"watched": "collect", "wish": "wish", "do": "do"}
+
+
+class _BackgroundServer:
+    """在后台线程中运行的ThreadingHTTPServer"""
+
+    def __init__(self, handler_class):
+        server = self
+
+        class Handler(handler_class):
+            service = server
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.counts: Counter = Counter()
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, endpoint: str, size: int):
+        with self._lock:
+            self.counts[endpoint] += 1
+            self.bytes += size
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts = Counter()
+            self.bytes = 0
+
+
+class _NotionHandler(BaseHTTPRequestHandler):
+    service: "FakeNotionServer"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        parts = [part for part in url.path.split("/") if part][1:]
+        status, payload, endpoint = self.service.handle(method, parts, parse_qs(url.query), body)
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.service.count(endpoint, length + len(data))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", str(self.service.retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeNotionServer(_BackgroundServer):
+    """内存中的Notion数据库"""
+
+    def __init__(self, latency: float = 0.0, rate_limit_ratio: float = 0.0, retry_after: float = 0.1,
+                 seed: int = 0):
+        """
+        Args:
+            latency: 每个请求的额外延迟(秒)
+            rate_limit_ratio: 随机返回429的请求比例
+            retry_after: 429响应的Retry-After秒数
+            seed: 429注入的随机种子
+        """
+        super().__init__(_NotionHandler)
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self.reset()
+
+    def reset(self):
+        """清空数据库"""
+        with self._lock:
+            self.schema: Dict[str, Any] = {}
+            self.pages: Dict[str, Dict[str, Any]] = {}
+            self.by_douban_id: Dict[str, str] = {}
+
+    def handle(self, method: str, parts: List[str], query: Dict[str, List[str]], body: Dict[str, Any]):
+        """返回(状态码, 响应体, 统计用的接口名)"""
+        endpoint = f"{method} /{parts[0]}" + ("/query" if parts[-1:] == ["query"] else "")
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            limited = self._random.random() < self.rate_limit_ratio
+        if limited:
+            self.count("429", 0)
+            return 429, {"object": "error", "status": 429, "code": "rate_limited",
+                         "message": "Rate limited"}, endpoint
+
+        with self._lock:
+            if parts[0] == "databases" and method == "POST" and len(parts) == 1:
+                self._update_schema(body.get("properties", {}))
+                return 200, {"object": "database", "id": "fake-database"}, endpoint
+            if parts[0] == "databases" and method == "GET":
+                return 200, self._database(), endpoint
+            if parts[0] == "databases" and method == "PATCH":
+                self._update_schema(body.get("properties", {}))
+                return 200, self._database(), endpoint
+            if parts[0] == "databases" and parts[-1] == "query":
+                return 200, self._query(body, query.get("filter_properties")), endpoint
+            if parts[0] == "pages" and method == "POST":
+                return 200, self._create_page(body.get("properties", {})), endpoint
+            if parts[0] == "pages" and method == "PATCH" and parts[1] in self.pages:
+                return 200, self._update_page(parts[1], body), endpoint
+
+        return 404, {"object": "error", "status": 404, "code": "object_not_found",
+                     "message": "Not found"}, endpoint
+
+    def _database(self) -> Dict[str, Any]:
+        return {"object": "database", "id": "fake-database", "properties": self.schema}
+
+    def _update_schema(self, properties: Dict[str, Any]):
+        for name, prop in properties.items():
+            prop_type = next(iter(prop))
+            current = self.schema.setdefault(name, {"id": name, "name": name, "type": prop_type, prop_type: {}})
+            options = (prop.get(prop_type) or {}).get("options")
+            if options is not None:
+                known = current[prop_type].setdefault("options", [])
+                names = {option["name"] for option in known}
+                known.extend(option for option in options if option["name"] not in names)
+
+    def _query(self, body: Dict[str, Any], filter_properties: Optional[List[str]]) -> Dict[str, Any]:
+        conditions = body.get("filter")
+        if conditions:
+            wanted = [cond["rich_text"]["equals"] for cond in conditions.get("or", [conditions])]
+            page_ids = [self.by_douban_id[i] for i in wanted if i in self.by_douban_id]
+        else:
+            page_ids = [page_id for page_id, page in self.pages.items() if not page["archived"]]
+
+        start = int(body.get("start_cursor") or 0)
+        size = int(body.get("page_size") or 100)
+        results = [self._render(self.pages[page_id], filter_properties) for page_id in page_ids[start:start + size]]
+        has_more = start + size < len(page_ids)
+        return {
+            "object": "list",
+            "results": results,
+            "has_more": has_more,
+            "next_cursor": str(start + size) if has_more else None
+        }
+
+    def _create_page(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        page_id = f"page-{next(self._ids)}"
+        page = {"object": "page", "id": page_id, "archived": False, "properties": {}}
+        self.pages[page_id] = page
+        self._set_properties(page, properties)
+        return self._render(page)
+
+    def _update_page(self, page_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        page = self.pages[page_id]
+        self._set_properties(page, body.get("properties", {}))
+        if body.get("archived"):
+            page["archived"] = True
+            douban_id = self._douban_id(page)
+            if self.by_douban_id.get(douban_id) == page_id:
+                del self.by_douban_id[douban_id]
+        return self._render(page)
+
+    def _set_properties(self, page: Dict[str, Any], properties: Dict[str, Any]):
+        for name, prop in properties.items():
+            prop_type = next(iter(prop))
+            value = prop[prop_type]
+            if prop_type in ("title", "rich_text"):
+                value = [dict(item, type="text", plain_text=item["text"]["content"]) for item in value]
+            self._update_schema({name: {prop_type: {"options": value} if prop_type == "multi_select" else {}}})
+            page["properties"][name] = {"id": name, "type": prop_type, prop_type: value}
+
+        douban_id = self._douban_id(page)
+        if douban_id and not page["archived"]:
+            self.by_douban_id[douban_id] = page["id"]
+
+    @staticmethod
+    def _douban_id(page: Dict[str, Any]) -> str:
+        rich_text = page["properties"].get("豆瓣ID", {}).get("rich_text") or [{}]
+        return rich_text[0].get("plain_text", "")
+
+    @staticmethod
+    def _render(page: Dict[str, Any], filter_properties: Optional[List[str]] = None) -> Dict[str, Any]:
+        properties = page["properties"]
+        if filter_properties:
+            properties = {name: prop for name, prop in properties.items() if prop["id"] in filter_properties}
+        return {"object": "page", "id": page["id"], "archived": page["archived"], "properties": properties}
+
+
+class _DoubanHandler(BaseHTTPRequestHandler):
+    service: "FakeDoubanServer"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        start = int(parse_qs(url.query).get("start", ["0"])[0])
+        if self.service.latency:
+            time.sleep(self.service.latency)
+
+        ids = self.service.lists.get(parts[-1]) if len(parts) == 3 and parts[0] == "people" else None
+        if ids is None:
+            self.send_error(404)
+            return
+        if self.service.blocked():
+            self.service.count("403", 0)
+            self.send_error(403)
+            return
+
+        if self.service.take_interstitial(parts[-1], start):
+            data = self.service.INTERSTITIAL.encode("utf-8")
+            self.service.count("interstitial", len(data))
+        else:
+            data = self.service.render_page(ids, start).encode("utf-8")
+            self.service.count(f"GET /{parts[-1]}", len(data))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeDoubanServer(_BackgroundServer):
+    """按列表生成豆瓣用户电影列表页"""
+
+    PAGE_SIZE = 15
+    # 豆瓣的验证码/封禁页面：状态码200，没有条目和总数
+    INTERSTITIAL = "<html><body><p>检测到有异常请求从你的 IP 发出，请登录使用豆瓣。</p></body></html>"
+
+    def __init__(self, latency: float = 0.0, block_ratio: float = 0.0, seed: int = 0):
+        """
+        Args:
+            latency: 每个请求的额外延迟(秒)
+            block_ratio: 随机返回403的请求比例
+            seed: 403注入的随机种子
+        """
+        super().__init__(_DoubanHandler)
+        self.latency = latency
+        self.block_ratio = block_ratio
+        self._random = random.Random(seed)
+        self.lists: Dict[str, List[int]] = {}
+        self._next_id = itertools.count(1000000)
+        self.interstitials: Dict[Tuple[str, int], int] = {}
+
+    def blocked(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.block_ratio
+
+    def add_interstitial(self, status: str, page: int, count: int = 1):
+        """让指定列表页接下来的count次请求返回200的验证码页面"""
+        self.interstitials[(LIST_PATHS[status], page * self.PAGE_SIZE)] = count
+
+    def take_interstitial(self, path: str, start: int) -> bool:
+        with self._lock:
+            remaining = self.interstitials.get((path, start), 0)
+            if remaining:
+                self.interstitials[(path, start)] = remaining - 1
+            return remaining > 0
+
+    def populate(self, sizes: Dict[str, int]):
+        """按 状态 -> 电影数 重新生成各列表"""
+        self.lists = {LIST_PATHS[status]: [next(self._next_id) for _ in range(size)] for status, size in sizes.items()}
+
+    def prepend(self, status: str, count: int):
+        """在列表最前面加入新标记的电影"""
+        path = LIST_PATHS[status]
+        self.lists[path] = [next(self._next_id) for _ in range(count)] + self.lists[path]
+
+    def render_page(self, ids: List[int], start: int) -> str:
+        """生成一个列表页，字段取值随电影ID变化"""
+        total = len(ids)
+        items = "".join(self._render_item(douban_id) for douban_id in ids[start:start + self.PAGE_SIZE])
+        return (
+            '<html><body><div class="mode">'
+            f'<span class="subject-num">{start + 1}-{min(start + self.PAGE_SIZE, total)}&nbsp;/&nbsp;{total}</span>'
+            f'</div><div class="grid-view">{items}</div></body></html>'
+        )
+
+    def _render_item(self, douban_id: int) -> str:
+        subject_url = f"{self.url}/subject/{douban_id}/"
+        year = 1950 + douban_id % 75
+        return (
+            '<div class="item comment-item"><div class="pic">'
+            f'<a title="电影{douban_id}" href="{subject_url}" class="nbg">'
+            f'<img alt="电影{douban_id}" src="https://img9.doubanio.com/view/photo/s_ratio_poster/public/p{douban_id}.jpg">'
+            '</a></div><div class="info"><ul><li class="title">'
+            f'<a href="{subject_url}"><em>电影{douban_id} / Movie {douban_id}</em></a></li>'
+            f'<li class="intro">{year}-01-01(中国大陆) / 演员{douban_id % 300} / '
+            f'{["中国大陆", "美国", "日本", "法国", "韩国"][douban_id % 5]} / 导演{douban_id % 200} / '
+            f'{80 + douban_id % 90}分钟 / 剧情</li>'
+            f'<li><span class="rating{1 + douban_id % 5}-t"></span>'
+            f'<span class="date">2024-{1 + douban_id % 12:02d}-{1 + douban_id % 28:02d}</span></li>'
+            f'<li><span class="comment">评论{douban_id}</span></li>'
+            '</ul></div></div>'
+        )
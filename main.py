@@ -1,18 +1,163 @@
-from src.sync_service import SyncService
+import argparse
+import json
+import signal
+import sys
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="豆瓣电影同步到Notion")
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="扫描Notion数据库，校正本地同步状态后再同步"
+    )
+    parser.add_argument(
+        "--mirror",
+        action="store_true",
+        default=None,
+        help="镜像模式：归档豆瓣列表中已不存在的电影页面"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=None,
+        help="与--mirror一起使用，只列出将被归档的页面而不实际归档"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="从上次中断运行的检查点继续同步"
+    )
+    parser.add_argument(
+        "--plan",
+        nargs="?",
+        const="sync_plan.json",
+        metavar="PATH",
+        help="计划模式：只计算将要新增、更新、归档的电影并写入JSON文件(默认sync_plan.json)，不写入Notion"
+    )
+
+    commands = parser.add_subparsers(dest="command", metavar="{crawl,push,batch}", help="不指定时抓取豆瓣并同步到Notion")
+    crawl_parser = commands.add_parser("crawl", help="只抓取豆瓣，把电影写入JSONL快照")
+    crawl_parser.add_argument("--out", required=True, metavar="PATH", help="快照文件路径")
+    push_parser = commands.add_parser("push", help="把JSONL快照同步到Notion，不访问豆瓣")
+    push_parser.add_argument("--in", dest="input", required=True, metavar="PATH", help="快照文件路径")
+    push_parser.add_argument(
+        "--previous",
+        metavar="PATH",
+        help="上一份已成功推送的快照，只推送相比它新增或变化的电影"
+    )
+    push_parser.add_argument(
+        "--allow-incomplete",
+        action="store_true",
+        help="允许推送未完整抓取的快照(.partial文件)"
+    )
+    batch_parser = commands.add_parser("batch", help="按批量配置文件同步多个豆瓣用户到各自的Notion数据库")
+    batch_parser.add_argument("--config", required=True, metavar="PATH", help="批量配置文件(JSON)")
+    batch_parser.add_argument("--workers", type=int, default=4, help="同时同步的租户数(默认4)")
+
+    args = parser.parse_args()
+    if args.command == "batch" and args.plan:
+        parser.error("batch不支持--plan")
+    return args
+
+def print_stats(sync_result):
+    """输出同步统计"""
+    print(f"\n🎉 电影同步已完成!")
+    print(f"📊 同步统计:")
+    print(f"   总处理电影数: {sync_result['total']}")
+    print(f"   新增电影数: {sync_result['added']}")
+    print(f"   更新电影数: {sync_result['updated']}")
+    print(f"   未变化电影数: {sync_result.get('unchanged', 0)}")
+    print(f"   失败电影数: {sync_result['failed']}")
+    print(f"   Notion重试次数: {sync_result.get('retries', 0)}")
+    print(f"   重试等待时间: {sync_result.get('retry_wait', 0)}秒")
+    if "resumed" in sync_result:
+        print(f"   检查点中已完成的电影数: {sync_result['resumed']}")
+    if "orphans" in sync_result:
+        print(f"   已不在豆瓣的电影数: {sync_result['orphans']}")
+        print(f"   已归档电影数: {sync_result['archived']}")
+    print(f"   豆瓣重试次数: {sync_result.get('douban_retries', 0)}")
+    for status, error in sync_result.get("incomplete", {}).items():
+        print(f"   ⚠️ {status}列表抓取不完整，停在{error}，可使用--resume继续")
+    if "http_cache_hit_rate" in sync_result:
+        print(f"   豆瓣HTTP缓存命中率: {sync_result['http_cache_hit_rate']:.1%}")
+
+def print_crawl(crawl_result):
+    """输出快照抓取结果"""
+    print(f"\n📦 已将{crawl_result['total']}部电影写入快照 {crawl_result['path']}")
+    for status, error in crawl_result.get("incomplete", {}).items():
+        print(f"   ⚠️ {status}列表抓取不完整，停在{error}")
+    if "incomplete" in crawl_result:
+        print("   快照未完整，推送时需要--allow-incomplete")
+
+def print_batch(results):
+    """输出每个租户的同步统计"""
+    for name, sync_result in results.items():
+        print(f"\n👤 租户 {name}")
+        if "error" in sync_result:
+            print(f"❌ 同步失败: {sync_result['error']}")
+        else:
+            print_stats(sync_result)
+
+def print_plan(plan, path):
+    """输出计划摘要"""
+    counts = plan["counts"]
+    requests = plan["requests"]
+    print(f"\n📋 同步计划({'全量' if plan['mode'] == 'full' else '增量'}，已写入 {path}):")
+    print(f"   总处理电影数: {counts['total']}")
+    print(f"   将新增: {counts['add']}")
+    print(f"   将更新: {counts['update']}")
+    print(f"   无需变化: {counts['unchanged']}")
+    if plan["mirror"]:
+        print(f"   将归档: {counts['archive']}")
+    print(f"   Notion请求数: 查询 {requests['lookup']} + 写入 {requests['write']} = {requests['total']}")
+    print(f"   按 {plan['rate_limit']} 次/秒限流预计耗时: {plan['estimated_seconds']}秒")
 
 if __name__ == "__main__":
+    args = parse_args()
+
+    # 被终止(如GitHub Actions超时)时正常退出，以便保存检查点
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(143))
+
+    failed = False
     try:
-        sync_service = SyncService()
-        sync_result = sync_service.sync_movies()
+        # 解析参数之后再导入，--help等不需要加载notion_client、requests和HTML解析器
+        from src.sync_service import SyncService
+
+        options = dict(reconcile=args.reconcile, mirror=args.mirror, dry_run=args.dry_run, resume=args.resume)
+
+        if args.command == "batch":
+            from src.batch import BatchRunner, load_batch
+
+            results = BatchRunner(load_batch(args.config), workers=args.workers, **options).run()
+            print_batch(results)
+            failed = any("error" in sync_result for sync_result in results.values())
+        else:
+            from src.config import Config
 
-        print(f"\n🎉 电影同步已完成!")
-        print(f"📊 同步统计:")
-        print(f"   总处理电影数: {sync_result['total']}")
-        print(f"   新增电影数: {sync_result['added']}")
-        print(f"   更新电影数: {sync_result['updated']}")
-        print(f"   失败电影数: {sync_result['failed']}")
+            # 只抓取豆瓣时不需要Notion配置
+            sync_service = SyncService(Config(require_notion=args.command != "crawl"), **options)
+
+            movies = None
+            if args.command == "push":
+                movies = sync_service.snapshot_movies(args.input, args.previous, args.allow_incomplete)
+
+            if args.command == "crawl":
+                crawl_result = sync_service.export_snapshot(args.out)
+                print_crawl(crawl_result)
+                failed = "incomplete" in crawl_result
+            elif args.plan:
+                plan = sync_service.plan_sync(movies)
+                with open(args.plan, "w", encoding="utf-8") as f:
+                    json.dump(plan, f, ensure_ascii=False, indent=2)
+                print_plan(plan, args.plan)
+            else:
+                print_stats(sync_service.sync_movies(movies))
 
     except Exception as e:
         print(f"\n❌ 同步过程中发生错误: {e}")
         print("请检查配置和网络连接后重试")
         raise
+
+    if failed:
+        sys.exit(1)
@@ -33,9 +33,10 @@ def setup_config():
     print("1. 已看电影")
     print("2. 想看电影")
     print("3. 在看电影")
-    status_choice = input("请输入选择(1/2/3, 默认1): ").strip() or "1"
+    print("4. 全部(已看+想看+在看)")
+    status_choice = input("请输入选择(1/2/3/4, 默认1): ").strip() or "1"
 
-    status_map = {"1": "watched", "2": "wish", "3": "do"}
+    status_map = {"1": "watched", "2": "wish", "3": "do", "4": "watched,wish,do"}
     env_vars["SYNC_STATUS"] = status_map.get(status_choice, "watched")
 
     incremental = input("是否启用增量同步(只同步新电影)? (y/n, 默认n): ").strip().lower()
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from string import Template
+from typing import Any, Dict, Optional
+from .config import Config
+from .rate_limiter import FairShare
+from .sync_service import SyncService
+
+logger = logging.getLogger(__name__)
+
+# 全局共享的豆瓣限流设置，只读取defaults和环境变量，租户中单独设置无效
+SHARED_KEYS = {"DOUBAN_RATE_LIMIT", "DOUBAN_MIN_RATE", "DOUBAN_MAX_RATE"}
+
+
+def load_batch(path: str, base_env: Optional[Dict[str, str]] = None) -> Dict[str, Config]:
+    """
+    读取批量配置文件，为每个租户生成独立的Config
+
+    配置文件为JSON，defaults和每个租户都用环境变量名作键，租户的设置覆盖defaults，
+    defaults覆盖环境变量；文件中的值里的$VAR/${VAR}按环境变量展开($$表示$)，令牌可以不写在文件里，
+    引用的环境变量未设置时报错：
+
+        {
+          "defaults": {"SYNC_STATUS": "watched", "INCREMENTAL_SYNC": "true"},
+          "tenants": [
+            {"name": "alice", "DOUBAN_USER_ID": "alice", "SYNC_STATUS": "watched,wish",
+             "NOTION_API_KEY": "${ALICE_NOTION_TOKEN}", "NOTION_DATABASE_ID": "..."}
+          ]
+        }
+
+    未单独设置STATE_DIR的租户使用STATE_DIR/<name>，各租户的水位线、同步状态和检查点互不影响；
+    设置了PROMETHEUS_TEXTFILE时每个租户写入 <文件名>.<name>.prom
+
+    Args:
+        path: 批量配置文件路径
+        base_env: 基础配置，默认先加载.env文件再读取os.environ
+
+    Returns:
+        租户名 -> Config，按配置文件中的顺序
+    """
+    if base_env is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        base_env = dict(os.environ)
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    defaults = {key: str(value) for key, value in data.get("defaults", {}).items()}
+    tenants = data.get("tenants") or []
+    if not tenants:
+        raise ValueError(f"批量配置文件中没有租户: {path}")
+
+    shared_env = {**base_env, **defaults}
+    state_dir = shared_env.get("STATE_DIR", ".sync_state")
+    configs = {}
+    for index, tenant in enumerate(tenants):
+        tenant = {key: str(value) for key, value in tenant.items()}
+        name = tenant.pop("name", None) or tenant.get("DOUBAN_USER_ID") or str(index)
+        if name in configs:
+            raise ValueError(f"批量配置文件中租户名重复: {name}")
+
+        ignored = SHARED_KEYS & tenant.keys()
+        if ignored:
+            logger.warning(f"[{name}] 豆瓣限流为所有租户共享，忽略租户中的设置: {', '.join(sorted(ignored))}")
+
+        file_env = {**defaults, **{key: value for key, value in tenant.items() if key not in SHARED_KEYS}}
+        env = {**base_env, **{key: _expand(name, key, value, base_env) for key, value in file_env.items()}}
+        if "STATE_DIR" not in tenant:
+            env["STATE_DIR"] = os.path.join(state_dir, name)
+        if "RUN_REPORT" not in tenant:
+            env.pop("RUN_REPORT", None)
+        if env.get("PROMETHEUS_TEXTFILE") and "PROMETHEUS_TEXTFILE" not in tenant:
+            root, ext = os.path.splitext(env["PROMETHEUS_TEXTFILE"])
+            env["PROMETHEUS_TEXTFILE"] = f"{root}.{name}{ext or '.prom'}"
+
+        configs[name] = Config(env)
+    return configs
+
+
+def _expand(name: str, key: str, value: str, base_env: Dict[str, str]) -> str:
+    """展开批量配置文件中的$VAR/${VAR}，变量未设置或占位符无效时抛出带租户名的异常"""
+    try:
+        return Template(value).substitute(base_env)
+    except KeyError as e:
+        raise ValueError(f"租户 {name} 的 {key} 引用了未设置的环境变量 {e.args[0]}") from None
+    except ValueError as e:
+        raise ValueError(f"租户 {name} 的 {key} 中有无效的$占位符(字面的$请写成$$): {e}") from None
+
+
+class BatchRunner:
+    """
+    在一个进程中为多个租户(豆瓣用户 -> Notion数据库)执行同步
+
+    - 所有租户共用豆瓣的HTTP会话和Notion的httpx连接池
+    - 豆瓣请求共用一个自适应限流器(全局礼貌预算)，Notion请求按令牌共用限流器，
+      同一令牌下的多个数据库共享Notion对该令牌的速率限制
+    - 共享的限流器按租户轮转发放令牌，并发线程多的租户不会挤占其他租户
+    - 最多workers个租户同时同步，每个租户独立统计并写入各自的运行报告
+    """
+
+    def __init__(self, configs: Dict[str, Config], workers: int = 4, **options):
+        """
+        Args:
+            configs: 租户名 -> Config
+            workers: 同时同步的租户数
+            options: 传给每个SyncService的参数(reconcile、mirror、dry_run、resume)
+        """
+        import httpx
+        from requests.adapters import HTTPAdapter
+
+        if not configs:
+            raise ValueError("没有需要同步的租户")
+
+        self.workers = max(1, min(workers, len(configs)))
+        self.services = {name: SyncService(config, **options) for name, config in configs.items()}
+
+        first = next(iter(self.services.values()))
+        session = first.douban_api.session
+        pool_size = self.workers * max(
+            config.douban_workers * len(config.sync_statuses) + config.detail_workers
+            for config in configs.values()
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        douban_share = FairShare(first.douban_api.rate_limiter)
+
+        notion_pool_size = self.workers * max(config.notion_workers for config in configs.values())
+        self.transport = httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=notion_pool_size, max_keepalive_connections=notion_pool_size)
+        )
+        notion_shares: Dict[str, FairShare] = {}
+
+        for name, service in self.services.items():
+            service.metrics.labels["tenant"] = name
+
+            douban_api = service.douban_api
+            if douban_api.session is not session:
+                douban_api.session.close()
+                douban_api.session = session
+            douban_api.rate_limiter = douban_share.for_tenant(name)
+
+            notion_api = service.notion_api
+            notion_api.notion.close()
+            notion_api.notion = notion_api._create_client(transport=self.transport)
+            token = service.config.notion_api_key
+            if token not in notion_shares:
+                notion_shares[token] = FairShare(notion_api.rate_limiter)
+            notion_api.rate_limiter = notion_shares[token].for_tenant(name)
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """
+        同步所有租户，单个租户失败不影响其他租户
+
+        Returns:
+            租户名 -> 同步统计，失败的租户为 {"error": 错误信息}
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tenant") as executor:
+            futures = {
+                executor.submit(self._run_tenant, name, service): name
+                for name, service in self.services.items()
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+        self.transport.close()
+        return {name: results[name] for name in self.services}
+
+    def _run_tenant(self, name: str, service: SyncService) -> Dict[str, Any]:
+        logger.info(f"[{name}] 开始同步 {service.config.douban_user_id} -> {service.config.notion_database_id}")
+        try:
+            stats = service.sync_movies()
+        except Exception as e:
+            logger.error(f"[{name}] 同步失败: {e}")
+            return {"error": str(e)}
+
+        logger.info(
+            f"[{name}] 同步完成: 新增{stats['added']}部，更新{stats['updated']}部，失败{stats['failed']}部"
+        )
+        return stats
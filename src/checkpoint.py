@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from .models import DoubanMovie
+
+
+class Checkpoint:
+    """
+    同步检查点，记录本次运行已抓取的豆瓣列表页和已处理完的电影
+
+    写入先进入未提交的事务，距上次提交超过指定间隔时才落盘，
+    进程被中断时最多丢失最后一个间隔内的进度
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            status TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            movies TEXT NOT NULL,
+            PRIMARY KEY (status, page)
+        );
+        CREATE TABLE IF NOT EXISTS done (
+            douban_id TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path: str, interval: float = 30):
+        """
+        打开检查点文件，不存在时自动创建
+
+        Args:
+            path: SQLite文件路径
+            interval: 两次落盘之间的最短秒数
+        """
+        self.path = path
+        self.interval = interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+        self._last_commit = time.monotonic()
+
+    def start(self, run_info: Dict[str, Any]):
+        """清空旧检查点，开始记录新的一次运行"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.execute("DELETE FROM done")
+            self._conn.execute("DELETE FROM meta")
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('run', ?)",
+                (json.dumps(dict(run_info, started_at=time.time()), ensure_ascii=False),)
+            )
+        self._last_commit = time.monotonic()
+
+    def run_info(self) -> Optional[Dict[str, Any]]:
+        """未完成运行的信息，没有检查点时返回None"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'run'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record_page(self, status: str, page: int, movies: List[DoubanMovie], total: Optional[int] = None):
+        """记录一个已抓取的列表页及其中的电影，total为列表的条目总数(可选)"""
+        data = json.dumps([movie.to_dict() for movie in movies], ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (status, page, movies) VALUES (?, ?, ?)",
+                (status, page, data)
+            )
+            if total is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (f"total:{status}", str(total))
+                )
+            self._maybe_commit()
+
+    def total(self, status: str) -> Optional[int]:
+        """上次运行记录的列表条目总数，没有记录时返回None"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (f"total:{status}",)).fetchone()
+        return int(row[0]) if row else None
+
+    def mark_done(self, douban_ids: Iterable[str]):
+        """记录已写入Notion或确认无需写入的电影"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO done (douban_id) VALUES (?)",
+                [(douban_id,) for douban_id in douban_ids]
+            )
+            self._maybe_commit()
+
+    def pages(self, status: str) -> Tuple[int, List[DoubanMovie]]:
+        """
+        读取某个状态从第一页起连续抓取完成的页面
+
+        Returns:
+            (下一个需要抓取的页码, 已抓取页面中的电影)
+        """
+        next_page = 0
+        movies = []
+        for page, data in self._conn.execute(
+            "SELECT page, movies FROM pages WHERE status = ? ORDER BY page", (status,)
+        ):
+            if page != next_page:
+                break
+            movies.extend(DoubanMovie.from_dict(item) for item in json.loads(data))
+            next_page += 1
+        return next_page, movies
+
+    def done(self) -> Set[str]:
+        """已处理完的豆瓣ID"""
+        return {row[0] for row in self._conn.execute("SELECT douban_id FROM done")}
+
+    def _maybe_commit(self):
+        if time.monotonic() - self._last_commit >= self.interval:
+            self._conn.commit()
+            self._last_commit = time.monotonic()
+
+    def flush(self):
+        """立即落盘"""
+        with self._lock:
+            self._conn.commit()
+            self._last_commit = time.monotonic()
+
+    def clear(self):
+        """运行正常结束后删除检查点"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.execute("DELETE FROM done")
+            self._conn.execute("DELETE FROM meta")
+
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
@@ -0,0 +1,45 @@
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_bounded_map(fn: Callable[[T], R], items: Iterable[T],
+                        workers: int) -> Iterator[Tuple[T, "Future[R]"]]:
+    """
+    用线程池并发执行fn，按items的原顺序逐个产出(元素, 已完成的Future)
+
+    同时在途的任务数限制为线程数的两倍，上一个结果被取走后才提交新任务，
+    消费方处理变慢时上游也随之暂停；items按需读取，可以是边抓取边产出的迭代器。
+    fn抛出的异常保存在Future中，由消费方调用result()时处理；消费方提前停止迭代时
+    取消尚未开始的任务
+
+    Args:
+        fn: 对每个元素执行的函数
+        items: 输入元素
+        workers: 线程数
+    """
+    workers = max(1, workers)
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        window = deque(
+            (item, executor.submit(fn, item))
+            for item in itertools.islice(items, workers * 2)
+        )
+
+        try:
+            while window:
+                item, future = window.popleft()
+                wait([future])
+
+                for next_item in itertools.islice(items, 1):
+                    window.append((next_item, executor.submit(fn, next_item)))
+
+                yield item, future
+
+        finally:
+            for _, pending in window:
+                pending.cancel()
@@ -1,27 +1,83 @@
 import os
-from dotenv import load_dotenv
+from typing import Mapping, Optional
 
 class Config:
-    """配置管理类，用于加载和验证环境变量"""
+    """
+    配置管理类，用于加载和验证环境变量
 
-    def __init__(self):
-        load_dotenv()
+    每个实例在创建时读取一次配置，DoubanAPI、NotionAPI和SyncService都显式接收实例，
+    导入模块时不读取环境变量
+    """
+
+    def __init__(self, env: Optional[Mapping[str, str]] = None, require_notion: bool = True):
+        """
+        Args:
+            env: 配置来源，默认先加载.env文件再读取os.environ
+            require_notion: 是否要求配置NOTION_API_KEY，只抓取豆瓣(crawl)时不需要
+        """
+        if env is None:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            env = os.environ
+        self._env = env
 
         self.douban_user_id = self._get_env_var("DOUBAN_USER_ID")
-        self.notion_api_key = self._get_env_var("NOTION_API_KEY")
-        self.notion_database_id = os.getenv("NOTION_DATABASE_ID", "")
-        self.notion_parent_page_id = os.getenv("NOTION_PARENT_PAGE_ID", "")
+        self.notion_api_key = self._get_env_var("NOTION_API_KEY", default=None if require_notion else "")
+        self.notion_database_id = self._env.get("NOTION_DATABASE_ID", "")
+        self.notion_parent_page_id = self._env.get("NOTION_PARENT_PAGE_ID", "")
 
         self.sync_status = self._get_env_var("SYNC_STATUS", default="watched")
+        self.sync_statuses = list(dict.fromkeys(
+            status.strip() for status in self.sync_status.split(",") if status.strip()
+        ))
+
+        invalid_statuses = [status for status in self.sync_statuses if status not in ["watched", "wish", "do"]]
+        if invalid_statuses or not self.sync_statuses:
+            raise ValueError(
+                f"Invalid SYNC_STATUS: {self.sync_status}, must be one or more of: watched, wish, do (comma separated)"
+            )
 
-        if self.sync_status not in ["watched", "wish", "do"]:
-            raise ValueError(f"Invalid SYNC_STATUS: {self.sync_status}, must be one of: watched, wish, do")
+        self.incremental_sync = self._env.get("INCREMENTAL_SYNC", "false").lower() == "true"
+        self.sync_queue_size = int(self._env.get("SYNC_QUEUE_SIZE", "100"))
+        self.state_dir = self._env.get("STATE_DIR", ".sync_state")
+        self.state_reconcile_days = float(self._env.get("STATE_RECONCILE_DAYS", "7"))
+        self.run_report = self._env.get("RUN_REPORT", os.path.join(self.state_dir, "run_report.json"))
+        self.prometheus_textfile = self._env.get("PROMETHEUS_TEXTFILE", "")
+        self.checkpoint_interval = float(self._env.get("CHECKPOINT_INTERVAL", "30"))
+        self.checkpoint_max_age = float(self._env.get("CHECKPOINT_MAX_AGE", "24"))
+        self.mirror_mode = self._env.get("MIRROR_MODE", "false").lower() == "true"
+        self.mirror_dry_run = self._env.get("MIRROR_DRY_RUN", "false").lower() == "true"
 
-        self.incremental_sync = os.getenv("INCREMENTAL_SYNC", "false").lower() == "true"
+        self.douban_workers = int(self._env.get("DOUBAN_WORKERS", "3"))
+        self.douban_rate_limit = float(self._env.get("DOUBAN_RATE_LIMIT", "1"))
+        self.douban_min_rate = float(self._env.get("DOUBAN_MIN_RATE") or min(0.2, self.douban_rate_limit))
+        self.douban_max_rate = float(self._env.get("DOUBAN_MAX_RATE") or self.douban_rate_limit * 3)
+        self.douban_max_retries = int(self._env.get("DOUBAN_MAX_RETRIES", "4"))
+        self.douban_max_pages = int(self._env.get("DOUBAN_MAX_PAGES", "50"))
+        self.html_parser = self._env.get("HTML_PARSER", "auto")
+        self.http_cache = self._env.get("HTTP_CACHE", "true").lower() == "true"
+        self.http_cache_ttl = float(self._env.get("HTTP_CACHE_TTL", "3600"))
+        self.http_cache_max_mb = int(self._env.get("HTTP_CACHE_MAX_MB", "50"))
+        self.enrich_details = self._env.get("ENRICH_DETAILS", "false").lower() == "true"
+        self.detail_workers = int(self._env.get("DETAIL_WORKERS", "2"))
+        self.poster_mirror = self._env.get("POSTER_MIRROR", "false").lower() == "true"
+        self.poster_mirror_url = self._env.get("POSTER_MIRROR_URL", "")
+        self.poster_dir = self._env.get("POSTER_DIR") or os.path.join(self.state_dir, "posters")
+        self.poster_max_width = int(self._env.get("POSTER_MAX_WIDTH", "0"))
+        self.poster_workers = int(self._env.get("POSTER_WORKERS", "4"))
+        if self.poster_mirror and not self.poster_mirror_url:
+            raise ValueError("POSTER_MIRROR is enabled but POSTER_MIRROR_URL is not set")
+
+        self.notion_workers = int(self._env.get("NOTION_WORKERS", "4"))
+        self.notion_rate_limit = float(self._env.get("NOTION_RATE_LIMIT", "3"))
+        self.notion_rate_burst = int(self._env.get("NOTION_RATE_BURST", "5"))
+        self.notion_max_retries = int(self._env.get("NOTION_MAX_RETRIES", "5"))
+        self.notion_retry_budget = int(self._env.get("NOTION_RETRY_BUDGET", "200"))
 
     def _get_env_var(self, var_name, default=None):
         """获取环境变量，如果不存在且没有默认值则抛出异常"""
-        value = os.getenv(var_name, default)
+        value = self._env.get(var_name, default)
         if value is None:
             raise EnvironmentError(f"Environment variable {var_name} is not set")
         return value
@@ -29,5 +85,3 @@ class Config:
     def is_database_configured(self):
         """检查数据库是否已配置"""
         return bool(self.notion_database_id)
-
-config = Config()
@@ -1,14 +1,41 @@
-import requests
-from typing import List, Optional
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 from .models import DoubanMovie
-from .config import config
+from .concurrency import ordered_bounded_map
+from .config import Config
+from .http_cache import HttpCache
+from .metrics import Metrics
+from .parsers import get_parser
+from .rate_limiter import AdaptiveRateLimiter
+import math
+import os
+import random
+import threading
 import time
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    import requests
 
 class DoubanAPI:
     """豆瓣爬虫类，用于获取用户电影信息"""
 
-    def __init__(self):
+    BASE_URL = "https://movie.douban.com"
+    PAGE_SIZE = 15
+    # 豆瓣限流或封禁时返回的状态码，5xx也按临时错误重试
+    THROTTLE_STATUSES = {403, 418, 429}
+    # 列表页的标记(计数、网格/列表视图)，验证码和封禁页面中没有这些标记
+    LIST_MARKERS = ("subject-num", "grid-view", "list-view")
+    RETRY_BASE_DELAY = 2.0
+    RETRY_MAX_DELAY = 60.0
+
+    def __init__(self, config: Config):
+        """
+        Args:
+            config: 同步配置
+        """
+        import requests
+
+        self.config = config
         self.user_id = config.douban_user_id
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -17,6 +44,152 @@ class DoubanAPI:
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        self.max_workers = max(1, config.douban_workers)
+        self.rate_limiter = AdaptiveRateLimiter(
+            config.douban_rate_limit, 1,
+            min_rate=config.douban_min_rate,
+            max_rate=config.douban_max_rate
+        )
+        self.max_retries = config.douban_max_retries
+        self.retry_count = 0
+        self._retry_lock = threading.Lock()
+        self.crawl_complete: Dict[str, bool] = {}
+        self.crawl_errors: Dict[str, str] = {}
+        # 各列表第一页显示的条目总数，页面中没有总数时为None
+        self.crawl_totals: Dict[str, Optional[int]] = {}
+        self.metrics = Metrics()
+        self.parser = get_parser(config.html_parser)
+
+        self.http_cache = None
+        if config.http_cache:
+            self.http_cache = HttpCache(
+                os.path.join(config.state_dir, "http_cache.db"),
+                ttl=config.http_cache_ttl,
+                max_bytes=config.http_cache_max_mb * 1024 * 1024
+            )
+
+    def fetch(self, url: str, params: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+              cacheable: Optional[Callable[[str], bool]] = None, stage: str = "crawl") -> str:
+        """
+        获取页面HTML，启用HTTP缓存时优先使用缓存
+
+        缓存未过期时不发起请求；过期时带上ETag/Last-Modified发送条件请求，
+        服务端返回304时沿用缓存内容
+
+        Args:
+            url: 页面地址
+            params: 查询参数(可选)
+            use_cache: 是否读写HTTP缓存
+            cacheable: 判断新响应能否写入缓存(可选)，如列表页至少解析出一部电影，
+                避免把豆瓣返回200的验证码或封禁页面当作正常页面缓存
+            stage: 获取页面(含限流等待和重试)的耗时计入的阶段，解析和写入缓存不计入
+        """
+        cache = self.http_cache if use_cache else None
+        key = cache.make_key(url, params) if cache else None
+
+        with self.metrics.stage(stage):
+            entry = cache.get(key) if cache else None
+
+            if entry and entry["fresh"]:
+                cache.record("hits")
+                return entry["body"]
+
+            headers = {}
+            if entry:
+                if entry["etag"]:
+                    headers["If-None-Match"] = entry["etag"]
+                if entry["last_modified"]:
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            response = self._get(url, params, headers)
+
+            if entry and response.status_code == 304:
+                cache.refresh(key)
+                cache.record("revalidated")
+                return entry["body"]
+
+            response.raise_for_status()
+
+        if cache:
+            cache.record("misses")
+        if cache and (cacheable is None or cacheable(response.text)):
+            cache.put(
+                key, url, response.text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+
+        return response.text
+
+    def _get(self, url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str]) -> "requests.Response":
+        """
+        经过自适应限流器发送请求
+
+        成功时提高速率；遇到403/418/429/5xx、超时或连接错误时降低速率、所有线程一起暂停，
+        再重试同一个请求，超过重试次数后返回最后一次响应或抛出最后一次异常
+        """
+        endpoint = self._endpoint(url)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.session.get(url, params=params, headers=headers or None, timeout=30)
+            except OSError as e:
+                self.metrics.observe_request("douban", endpoint, time.perf_counter() - start, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                reason = type(e).__name__
+            else:
+                status_code = response.status_code
+                self.metrics.observe_request("douban", endpoint, time.perf_counter() - start, error=status_code >= 400)
+                self.metrics.add_bytes("douban", len(response.content))
+                if status_code not in self.THROTTLE_STATUSES and status_code < 500:
+                    if status_code < 400:
+                        self.rate_limiter.on_success()
+                    return response
+                if attempt >= self.max_retries:
+                    return response
+                reason = status_code
+
+            self._back_off(endpoint, reason, attempt, response)
+            attempt += 1
+
+    def _back_off(self, endpoint: str, reason: Any, attempt: int, response=None):
+        """被限流后降低速率并让所有线程暂停，下一次acquire时等待退避时间"""
+        delay = self._get_retry_delay(response, attempt)
+        self.rate_limiter.on_throttle(delay)
+        self.metrics.count_retry("douban", endpoint)
+        with self._retry_lock:
+            self.retry_count += 1
+        print(f"豆瓣请求失败({reason})，降速至{self.rate_limiter.rate:.2f}次/秒，{delay:.1f}秒后进行第{attempt + 1}次重试")
+
+    def _get_retry_delay(self, response, attempt: int) -> float:
+        """计算重试等待时间，优先使用Retry-After响应头"""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), self.RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+
+        backoff = min(self.RETRY_BASE_DELAY * (2 ** attempt), self.RETRY_MAX_DELAY)
+        return random.uniform(backoff / 2, backoff)
+
+    def _crawl_failed(self, status: str, page: int, error: Exception):
+        """记录列表抓取中断：重试后仍失败的页面及其后的页面都没有抓取"""
+        print(f"获取第{page+1}页电影失败，{status}列表抓取不完整: {error}")
+        self.crawl_complete[status] = False
+        self.crawl_errors[status] = f"第{page+1}页: {error}"
+
+    @staticmethod
+    def _endpoint(url: str) -> str:
+        """请求统计用的接口名：列表页为collect/wish/do，详情页为subject"""
+        parts = [part for part in urlparse(url).path.split("/") if part]
+        if parts[:1] == ["subject"]:
+            return "subject"
+        return parts[-1] if parts else "/"
 
     def get_user_movies(self, status: str = "watched", max_pages: int = 50) -> List[DoubanMovie]:
         """
@@ -29,120 +202,159 @@ class DoubanAPI:
         Returns:
             电影对象列表
         """
-        movies = []
-        page = 0
+        return list(self.iter_user_movies(status, max_pages))
+
+    def iter_user_movies(self,
+                         status: str = "watched",
+                         max_pages: int = 50,
+                         stop_when: Optional[Callable[[List[DoubanMovie]], bool]] = None,
+                         start_page: int = 0,
+                         on_page: Optional[Callable[[int, List[DoubanMovie]], None]] = None,
+                         total: Optional[int] = None) -> Iterator[DoubanMovie]:
+        """
+        逐页产出用户电影，调用方可以边抓取边处理
+
+        先抓取第一页得到条目总数，再用线程池并发抓取剩余页，
+        请求速率由令牌桶控制，电影按列表顺序产出
+
+        Args:
+            status: 电影状态，可选值：watched(已看), wish(想看), do(在看)
+            max_pages: 最大抓取页数
+            stop_when: 停止条件(可选)，传入一页电影，返回True时不再抓取后续页面
+            start_page: 从第几页(从0开始)开始抓取，用于从检查点恢复
+            on_page: 每页产出前的回调(可选)，传入页码和该页电影
+            total: 已知的条目总数(可选)，从检查点恢复时传入上次记录的总数
+        """
         status_map = {
             "watched": "collect",
             "wish": "wish",
             "do": "do"
         }
+        url = f"{self.BASE_URL}/people/{self.user_id}/{status_map[status]}"
 
-        while page < max_pages:
-            url = f"https://movie.douban.com/people/{self.user_id}/{status_map[status]}"
-            params = {"start": page * 15}
+        self.crawl_complete[status] = True
+        self.crawl_errors.pop(status, None)
+        self.crawl_totals.pop(status, None)
+        if start_page >= max_pages:
+            return
 
-            try:
-                response = self.session.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, "html.parser")
+        try:
+            movies, page_total = self._fetch_page(url, start_page, status, total)
+        except Exception as e:
+            self._crawl_failed(status, start_page, e)
+            return
+
+        total = page_total if page_total is not None else total
+        self.crawl_totals[status] = total
+
+        if not movies:
+            return
+        if on_page:
+            on_page(start_page, movies)
+        yield from movies
+
+        if stop_when and stop_when(movies):
+            return
+
+        if total is None:
+            pages = self._fetch_pages_serially(url, status, max_pages, start_page + 1)
+        else:
+            page_count = math.ceil(total / self.PAGE_SIZE)
+            if page_count > max_pages:
+                print(f"{status}列表共{total}部，超过DOUBAN_MAX_PAGES，只抓取前{max_pages}页")
+                page_count = max_pages
+            pages = self._fetch_pages_concurrently(url, status, range(start_page + 1, page_count), total)
+
+        for page, page_movies in pages:
+            if on_page:
+                on_page(page, page_movies)
+            yield from page_movies
+
+            if stop_when and stop_when(page_movies):
+                pages.close()
+                return
+
+    def _fetch_page(self, url: str, page: int, status: str,
+                    total: Optional[int] = None) -> Tuple[List[DoubanMovie], Optional[int]]:
+        """
+        抓取并解析单个列表页
+
+        豆瓣的验证码和封禁页面返回200但没有条目：页面中没有列表标记，或按条目总数(传入的或页面中的)
+        这一页本应有电影时，按限流处理，不使用缓存退避重试，超过重试次数后抛出异常
+
+        Args:
+            total: 已知的条目总数(可选)
 
-                movie_items = soup.find_all("div", class_="item")
-                if not movie_items:
-                    break
+        Returns:
+            (电影列表, 条目总数)，页面中没有总数信息时总数为None
+        """
+        params = {"start": page * self.PAGE_SIZE}
+        movies, page_total, is_list = self._fetch_list_html(url, params, status)
+
+        attempt = 0
+        while not movies and (not is_list or params["start"] < (total or page_total or 0)):
+            if attempt >= self.max_retries:
+                raise ValueError("页面中没有电影，可能触发了豆瓣反爬")
+            self._back_off(self._endpoint(url), "空页面" if is_list else "非列表页面", attempt)
+            attempt += 1
+            movies, page_total, is_list = self._fetch_list_html(url, params, status, use_cache=False)
+
+        return movies, page_total
+
+    def _fetch_list_html(self, url: str, params: Dict[str, Any], status: str,
+                         use_cache: bool = True) -> Tuple[List[DoubanMovie], Optional[int], bool]:
+        """获取并解析列表页，返回(电影列表, 条目总数, 页面中是否有列表标记)"""
+        result = None
 
-                for item in movie_items:
-                    movie = self._parse_movie_item(item, status)
-                    if movie:
-                        movies.append(movie)
+        def parse(html: str) -> Tuple[List[DoubanMovie], Optional[int]]:
+            nonlocal result
+            with self.metrics.stage("parse"):
+                result = self.parser.parse(html, status)
+            return result
 
-                page += 1
-                time.sleep(2)
+        # 新响应在写入缓存前解析，只缓存至少有一部电影的页面，解析结果直接复用
+        html = self.fetch(url, params, use_cache=use_cache, cacheable=lambda html: bool(parse(html)[0]))
+        movies, total = result if result is not None else parse(html)
+        return movies, total, any(marker in html for marker in self.LIST_MARKERS)
 
+    def _fetch_pages_concurrently(self, url: str, status: str, pages: range,
+                                  total: int) -> Iterator[Tuple[int, List[DoubanMovie]]]:
+        """
+        并发抓取多个列表页并按页序产出(页码, 电影列表)，某页重试后仍失败或仍为空页时放弃其后的页面
+
+        同时在途的页面数限制为线程数的两倍，消费方处理变慢时抓取也随之暂停
+        """
+        results = ordered_bounded_map(
+            lambda page: self._fetch_page(url, page, status, total), pages, self.max_workers
+        )
+        for page, future in results:
+            try:
+                page_movies, _ = future.result()
             except Exception as e:
-                print(f"获取第{page+1}页电影失败: {e}")
+                self._crawl_failed(status, page, e)
                 break
 
-        return movies
+            if not page_movies:
+                break
 
-    def _parse_movie_item(self, item, status: str) -> Optional[DoubanMovie]:
-        """解析单个电影条目"""
-        try:
-            title_elem = item.find("li", class_="title")
-            if not title_elem:
-                return None
-
-            title_link = title_elem.find("a")
-            if not title_link:
-                return None
-
-            title = title_link.text.strip()
-            url = title_link.get("href", "")
-            douban_id = url.split("/")[-2] if url else ""
-
-            info_elem = item.find("li", class_="intro")
-            info_text = info_elem.text.strip() if info_elem else ""
-
-            year = ""
-            regions = []
-            directors = []
-            if info_text:
-                parts = [p.strip() for p in info_text.split("/") if p.strip()]
-                if len(parts) >= 1:
-                    year = parts[0]
-                if len(parts) >= 2:
-                    regions = [r.strip() for r in parts[1].split(",")]
-                if len(parts) >= 3:
-                    directors = [d.strip() for d in parts[2].split(",")]
-
-            rating_elem = item.find("span", class_="rating5-t")
-            rating = 0.0
-            if rating_elem:
-                rating_class = rating_elem.get("class", [])
-                for cls in rating_class:
-                    if cls.startswith("rating"):
-                        try:
-                            rating = int(cls.replace("rating", "")) / 2.0
-                        except:
-                            pass
-
-            date_elem = item.find("span", class_="date")
-            rating_date = date_elem.text.strip() if date_elem else ""
-
-            comment_elem = item.find("span", class_="comment")
-            comment = comment_elem.text.strip() if comment_elem else ""
-
-            pic_elem = item.find("a", class_="nbg")
-            poster_url = ""
-            if pic_elem:
-                img = pic_elem.find("img")
-                if img:
-                    poster_url = img.get("src", "")
-
-            movie = DoubanMovie(
-                id=douban_id,
-                title=title,
-                original_title="",
-                year=year,
-                rating=rating,
-                genres=[],
-                directors=directors,
-                casts=[],
-                regions=regions,
-                release_date="",
-                duration=0,
-                url=url,
-                poster_url=poster_url,
-                summary="",
-                comment=comment,
-                rating_date=rating_date,
-                status=status
-            )
+            yield page, page_movies
 
-            return movie
+    def _fetch_pages_serially(self, url: str, status: str, max_pages: int,
+                              start_page: int = 1) -> Iterator[Tuple[int, List[DoubanMovie]]]:
+        """无法获取条目总数时，逐页抓取直到空页"""
+        page = start_page
+        while page < max_pages:
+            try:
+                page_movies, _ = self._fetch_page(url, page, status)
+            except Exception as e:
+                self._crawl_failed(status, page, e)
+                break
 
-        except Exception as e:
-            print(f"解析电影条目失败: {e}")
-            return None
+            if not page_movies:
+                break
+
+            yield page, page_movies
+            page += 1
 
     def get_watched_movies(self) -> List[DoubanMovie]:
         """获取已看电影列表"""
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
+from .concurrency import ordered_bounded_map
+from .models import DoubanMovie
+
+
+class DetailEnricher:
+    """详情页补全，抓取电影详情页补充类型、演员、简介等字段，结果按豆瓣ID缓存到磁盘"""
+
+    def __init__(self, douban_api, cache_dir: str, max_workers: int = 2):
+        """
+        初始化详情补全
+
+        Args:
+            douban_api: DoubanAPI实例，复用其会话、限流器、HTTP缓存和解析器
+            cache_dir: 详情缓存目录
+            max_workers: 并发抓取线程数
+        """
+        self.douban_api = douban_api
+        self.cache_dir = cache_dir
+        self.max_workers = max(1, max_workers)
+        self.stats = {"cached": 0, "fetched": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def enrich(self, movies: Iterable[DoubanMovie]) -> Iterator[DoubanMovie]:
+        """
+        按原顺序逐部产出补全后的电影
+
+        缓存命中的电影不发起请求；同时在途的详情请求数限制为线程数的两倍
+        """
+        for _, future in ordered_bounded_map(self.enrich_movie, movies, self.max_workers):
+            yield future.result()
+
+    def enrich_movie(self, movie: DoubanMovie) -> DoubanMovie:
+        """补全单部电影，失败时保留原有字段"""
+        detail = self._load_cache(movie.id)
+        if detail is not None:
+            self._count("cached")
+        else:
+            try:
+                detail = self._fetch_detail(movie)
+            except Exception as e:
+                self._count("failed")
+                print(f"获取电影详情失败 {movie.title}: {e}")
+                return movie
+
+            self._count("fetched")
+            self._save_cache(movie.id, detail)
+
+        self._apply(movie, detail)
+        return movie
+
+    def _fetch_detail(self, movie: DoubanMovie) -> Dict[str, Any]:
+        """抓取并解析详情页"""
+        if not movie.url:
+            raise ValueError("缺少豆瓣链接")
+
+        # 解析后的详情已缓存在cache_dir中，详情页不写入HTTP缓存，以免挤占列表页
+        html = self.douban_api.fetch(movie.url, use_cache=False, stage="enrich")
+        with self.douban_api.metrics.stage("parse"):
+            detail = self.douban_api.parser.parse_detail(html)
+        if not detail.get("original_title"):
+            raise ValueError("详情页中没有电影信息，可能触发了豆瓣反爬")
+        return detail
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _apply(movie: DoubanMovie, detail: Dict[str, Any]):
+        """将详情写入电影对象，列表页已有的字段不被空值覆盖"""
+        original_title = detail.get("original_title", "")
+        local_title = movie.title.split(" / ")[0].strip()
+        if local_title and original_title.startswith(local_title):
+            original_title = original_title[len(local_title):].strip() or local_title
+
+        movie.original_title = original_title or movie.original_title
+        movie.genres = tuple(detail.get("genres") or movie.genres)
+        movie.directors = tuple(detail.get("directors") or movie.directors)
+        movie.casts = tuple(detail.get("casts") or movie.casts)
+        movie.release_date = detail.get("release_date") or movie.release_date
+        movie.duration = detail.get("duration") or movie.duration
+        movie.summary = detail.get("summary") or movie.summary
+
+    def _cache_path(self, douban_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{douban_id}.json")
+
+    def _load_cache(self, douban_id: str) -> Optional[Dict[str, Any]]:
+        """读取详情缓存，不存在或损坏时返回None"""
+        try:
+            with open(self._cache_path(douban_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_cache(self, douban_id: str, detail: Dict[str, Any]):
+        """写入详情缓存"""
+        if not douban_id:
+            return
+
+        path = self._cache_path(douban_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(detail, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class HttpCache:
+    """基于SQLite的HTTP响应缓存，支持ETag/Last-Modified条件请求、TTL和按容量的LRU淘汰"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            stored_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            size INTEGER NOT NULL,
+            body BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+    """
+
+    def __init__(self, path: str, ttl: float = 3600, max_bytes: int = 50 * 1024 * 1024):
+        """
+        打开缓存文件，不存在时自动创建
+
+        Args:
+            path: SQLite文件路径
+            ttl: 缓存有效秒数，有效期内直接使用缓存，过期后发送条件请求
+            max_bytes: 缓存总大小上限，超出时淘汰最久未访问的响应
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """由URL和查询参数生成缓存键"""
+        raw = json.dumps([url, sorted((params or {}).items())], ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存条目
+
+        Returns:
+            包含body、etag、last_modified、fresh的字典，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, stored_at, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        etag, last_modified, stored_at, body = row
+        return {
+            "body": body.decode("utf-8"),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - stored_at < self.ttl,
+        }
+
+    def put(self, key: str, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """写入响应并按容量上限淘汰旧条目"""
+        data = body.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, etag, last_modified, stored_at, last_access, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, now, now, len(data), data)
+            )
+            self._evict()
+
+    def refresh(self, key: str):
+        """服务端返回304后重置条目的有效期"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key)
+            )
+
+    def _evict(self):
+        """按最近访问时间淘汰条目，直到总大小不超过上限"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def record(self, outcome: str):
+        """记录一次请求的缓存结果(hits/revalidated/misses)"""
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def hit_rate(self) -> float:
+        """缓存命中率，304重新验证也计为命中"""
+        total = sum(self.stats.values())
+        if not total:
+            return 0.0
+        return (self.stats["hits"] + self.stats["revalidated"]) / total
+
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
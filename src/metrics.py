@@ -0,0 +1,182 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Metrics:
+    """
+    同步运行指标：各阶段耗时、按接口统计的请求数/延迟/重试，以及传输字节数
+
+    线程安全，豆瓣抓取线程和Notion写入线程共用同一个实例。流水线中各阶段并行执行，
+    阶段耗时是该阶段内所有操作耗时的累计值，可能大于整次运行的时间
+    """
+
+    PREFIX = "douban_notion_sync"
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.latencies: Dict[tuple, List[float]] = defaultdict(list)
+        self.errors: Dict[tuple, int] = defaultdict(int)
+        self.retries: Dict[tuple, int] = defaultdict(int)
+        self.bytes: Dict[str, int] = defaultdict(int)
+        # 附加到所有Prometheus指标上的固定标签，如批量模式下的tenant
+        self.labels: Dict[str, str] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """统计一段代码的耗时并累加到指定阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start)
+
+    def add_stage_time(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] += seconds
+
+    def observe_request(self, service: str, endpoint: str, seconds: float, error: bool = False):
+        """记录一次请求的耗时，error表示请求失败(包括随后被重试的失败)"""
+        key = (service, endpoint)
+        with self._lock:
+            self.latencies[key].append(seconds)
+            if error:
+                self.errors[key] += 1
+
+    def count_retry(self, service: str, endpoint: str):
+        with self._lock:
+            self.retries[(service, endpoint)] += 1
+
+    def add_bytes(self, service: str, size: int):
+        with self._lock:
+            self.bytes[service] += size
+
+    @staticmethod
+    def _quantile(sorted_values: List[float], q: float) -> float:
+        """最近秩法计算分位数"""
+        index = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+        return sorted_values[index]
+
+    def report(self, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        生成运行报告
+
+        Returns:
+            包含started_at、duration、stages、requests、bytes、stats的字典
+        """
+        with self._lock:
+            latencies = {key: sorted(values) for key, values in self.latencies.items()}
+            errors = dict(self.errors)
+            retries = dict(self.retries)
+            stages = dict(self.stages)
+            transferred = dict(self.bytes)
+
+        requests: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        for (service, endpoint), values in sorted(latencies.items()):
+            entry = {
+                "count": len(values),
+                "errors": errors.get((service, endpoint), 0),
+                "retries": retries.get((service, endpoint), 0),
+                "total_seconds": round(sum(values), 3),
+                "max": round(values[-1], 4),
+            }
+            for q in self.QUANTILES:
+                entry[f"p{int(q * 100)}"] = round(self._quantile(values, q), 4)
+            requests[service][endpoint] = entry
+
+        return {
+            **({"labels": dict(self.labels)} if self.labels else {}),
+            "started_at": self.started_at,
+            "duration": round(time.perf_counter() - self._start, 3),
+            "stages": {name: round(seconds, 3) for name, seconds in stages.items()},
+            "requests": dict(requests),
+            "bytes": transferred,
+            "stats": stats or {},
+        }
+
+    def write_json(self, path: str, report: Dict[str, Any]):
+        """写入JSON运行报告"""
+        self._write_atomic(path, json.dumps(report, ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str, report: Dict[str, Any]):
+        """按node_exporter textfile格式写入指标"""
+        p = self.PREFIX
+        lines = [
+            f"# HELP {p}_last_run_timestamp_seconds 最近一次同步的开始时间",
+            f"# TYPE {p}_last_run_timestamp_seconds gauge",
+            f"{p}_last_run_timestamp_seconds {report['started_at']:.0f}",
+            f"# HELP {p}_run_duration_seconds 最近一次同步的总耗时",
+            f"# TYPE {p}_run_duration_seconds gauge",
+            f"{p}_run_duration_seconds {report['duration']}",
+            f"# HELP {p}_stage_seconds 各阶段累计耗时",
+            f"# TYPE {p}_stage_seconds gauge",
+        ]
+        lines += [f'{p}_stage_seconds{{stage="{name}"}} {seconds}' for name, seconds in report["stages"].items()]
+
+        lines += [
+            f"# HELP {p}_movies 最近一次同步各结果的电影数",
+            f"# TYPE {p}_movies gauge",
+        ]
+        lines += [
+            f'{p}_movies{{result="{name}"}} {value}'
+            for name, value in report["stats"].items()
+            if isinstance(value, int) and not isinstance(value, bool)
+        ]
+
+        for metric, field, help_text in (
+            ("requests", "count", "请求数"),
+            ("request_errors", "errors", "失败的请求数"),
+            ("request_retries", "retries", "重试次数"),
+        ):
+            lines += [f"# HELP {p}_{metric} {help_text}", f"# TYPE {p}_{metric} gauge"]
+            lines += [
+                f'{p}_{metric}{{service="{service}",endpoint="{endpoint}"}} {entry[field]}'
+                for service, endpoints in report["requests"].items()
+                for endpoint, entry in endpoints.items()
+            ]
+
+        lines += [
+            f"# HELP {p}_request_duration_seconds 请求延迟分位数",
+            f"# TYPE {p}_request_duration_seconds summary",
+        ]
+        for service, endpoints in report["requests"].items():
+            for endpoint, entry in endpoints.items():
+                labels = f'service="{service}",endpoint="{endpoint}"'
+                lines += [
+                    f'{p}_request_duration_seconds{{{labels},quantile="{q}"}} {entry[f"p{int(q * 100)}"]}'
+                    for q in self.QUANTILES
+                ]
+                lines.append(f"{p}_request_duration_seconds_sum{{{labels}}} {entry['total_seconds']}")
+                lines.append(f"{p}_request_duration_seconds_count{{{labels}}} {entry['count']}")
+
+        lines += [f"# HELP {p}_bytes 传输的字节数", f"# TYPE {p}_bytes gauge"]
+        lines += [f'{p}_bytes{{service="{service}"}} {size}' for service, size in report["bytes"].items()]
+
+        if self.labels:
+            lines = [line if line.startswith("#") else self._add_labels(line) for line in lines]
+        self._write_atomic(path, "\n".join(lines) + "\n")
+
+    def _add_labels(self, sample: str) -> str:
+        """给一行指标加上固定标签"""
+        extra = ",".join(f'{name}="{value}"' for name, value in self.labels.items())
+        metric, value = sample.rsplit(" ", 1)
+        if metric.endswith("}"):
+            return f"{metric[:-1]},{extra}}} {value}"
+        return f"{metric}{{{extra}}} {value}"
+
+    @staticmethod
+    def _write_atomic(path: str, content: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
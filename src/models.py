@@ -1,29 +1,46 @@
-from typing import List, Optional
+import hashlib
+import json
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 class DoubanMovie:
-    """豆瓣电影数据模型"""
-    
-    def __init__(self, 
-                 id: str, 
-                 title: str, 
-                 original_title: str, 
-                 year: str, 
-                 rating: float, 
-                 genres: List[str], 
-                 directors: List[str], 
-                 casts: List[str], 
-                 regions: List[str], 
-                 release_date: str, 
-                 duration: int, 
-                 url: str, 
-                 poster_url: str, 
-                 summary: str, 
-                 comment: Optional[str] = None, 
-                 rating_date: Optional[str] = None, 
+    """
+    豆瓣电影数据模型
+
+    使用__slots__存储字段，没有每个实例的__dict__；类型、导演、演员、地区等列表字段
+    以元组保存
+    """
+
+    __slots__ = (
+        "id", "title", "original_title", "year", "rating",
+        "genres", "directors", "casts", "regions",
+        "release_date", "duration", "url", "poster_url", "summary",
+        "comment", "rating_date", "status",
+    )
+
+    FIELDS = __slots__
+
+    def __init__(self,
+                 id: str,
+                 title: str,
+                 original_title: str,
+                 year: str,
+                 rating: float,
+                 genres: Iterable[str],
+                 directors: Iterable[str],
+                 casts: Iterable[str],
+                 regions: Iterable[str],
+                 release_date: str,
+                 duration: int,
+                 url: str,
+                 poster_url: str,
+                 summary: str,
+                 comment: Optional[str] = None,
+                 rating_date: Optional[str] = None,
                  status: str = "watched"):
         """
         初始化豆瓣电影对象
-        
+
         Args:
             id: 豆瓣电影ID
             title: 电影名称
@@ -48,10 +65,10 @@ class DoubanMovie:
         self.original_title = original_title
         self.year = year
         self.rating = rating
-        self.genres = genres
-        self.directors = directors
-        self.casts = casts
-        self.regions = regions
+        self.genres = tuple(genres)
+        self.directors = tuple(directors)
+        self.casts = tuple(casts)
+        self.regions = tuple(regions)
         self.release_date = release_date
         self.duration = duration
         self.url = url
@@ -60,13 +77,20 @@ class DoubanMovie:
         self.comment = comment
         self.rating_date = rating_date
         self.status = status
-    
+
     def __repr__(self):
         """返回电影对象的字符串表示"""
         return f"DoubanMovie(id={self.id}, title={self.title}, year={self.year}, rating={self.rating})"
-    
-    def to_dict(self):
-        """将电影对象转换为字典"""
+
+    def __getstate__(self):
+        return _values(self)
+
+    def __setstate__(self, state: Tuple[Any, ...]):
+        for name, value in zip(self.FIELDS, state):
+            setattr(self, name, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """将电影对象转换为字典，列表字段直接输出元组(json.dumps按数组序列化)"""
         return {
             "id": self.id,
             "title": self.title,
@@ -86,3 +110,25 @@ class DoubanMovie:
             "rating_date": self.rating_date,
             "status": self.status
         }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DoubanMovie":
+        """由to_dict()的结果还原电影对象，缺失的字段使用默认值，多余的键被忽略"""
+        get = data.get
+        return cls(
+            data["id"], get("title", ""), get("original_title", ""), get("year", ""), get("rating", 0.0),
+            get("genres", ()), get("directors", ()), get("casts", ()), get("regions", ()),
+            get("release_date", ""), get("duration", 0), get("url", ""), get("poster_url", ""),
+            get("summary", ""), get("comment"), get("rating_date"), get("status", "watched")
+        )
+
+    def canonical_json(self) -> str:
+        """稳定的JSON序列化：键排序、无多余空白，相同内容总是得到相同的字符串"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+    def content_hash(self) -> str:
+        """canonical_json()的sha256摘要，用于缓存键和变更检测"""
+        return hashlib.sha256(self.canonical_json().encode("utf-8")).hexdigest()
+
+
+_values = attrgetter(*DoubanMovie.FIELDS)
@@ -1,21 +1,203 @@
-from notion_client import Client, APIResponseError
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set
+import hashlib
+import json
+import random
+import threading
+import time
 from .models import DoubanMovie
-from .config import config
+from .config import Config
+from .metrics import Metrics
+from .rate_limiter import TokenBucket
+
+if TYPE_CHECKING:
+    import httpx
+    from notion_client import Client
 
 class NotionAPI:
     """Notion API调用类，用于管理Notion数据库和同步数据"""
 
-    def __init__(self):
-        self.notion = Client(auth=config.notion_api_key)
+    FILTER_BATCH_SIZE = 100
+    # 多选属性 -> DoubanMovie字段，写入前预先把新选项加入数据库结构
+    MULTI_SELECT_FIELDS = {"地区": "regions"}
+    STATUS_NAMES = {
+        "watched": "已看",
+        "wish": "想看",
+        "do": "在看"
+    }
+    RETRYABLE_CODES = {
+        "rate_limited",
+        "conflict_error",
+        "internal_server_error",
+        "service_unavailable",
+        "gateway_timeout",
+    }
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 60.0
+
+    def __init__(self, config: Config):
+        """
+        Args:
+            config: 同步配置
+        """
+        self.config = config
+        self.metrics = Metrics()
+        self.notion = self._create_client()
         self.database_id = config.notion_database_id
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._schema: Optional[Dict[str, Any]] = None
+        self._property_ids: Optional[Dict[str, str]] = None
+        self._select_options: Optional[Dict[str, Set[str]]] = None
+        self.rate_limiter = TokenBucket(config.notion_rate_limit, config.notion_rate_burst)
+
+        self.max_retries = config.notion_max_retries
+        self.retry_budget = config.notion_retry_budget
+        self.retry_stats = {"retries": 0, "retry_wait": 0.0}
+        self.request_count = 0
+        self._retry_lock = threading.Lock()
+
+    def _create_client(self, base_url: Optional[str] = None,
+                       transport: Optional["httpx.BaseTransport"] = None) -> "Client":
+        """
+        创建Notion客户端，通过httpx事件钩子统计传输的字节数
+
+        Args:
+            base_url: Notion接口地址(可选)
+            transport: httpx传输层(可选)，多个客户端传入同一个传输层时共用连接池
+        """
+        import httpx
+        from notion_client import Client
+
+        options = {"auth": self.config.notion_api_key}
+        if base_url:
+            options["base_url"] = base_url
+        http_client = httpx.Client(transport=transport, event_hooks={"response": [self._count_bytes]})
+        return Client(client=http_client, **options)
+
+    def _count_bytes(self, response: "httpx.Response"):
+        response.read()
+        self.metrics.add_bytes("notion", len(response.request.content) + len(response.content))
+
+    def _call(self, method, find_existing: Optional[Callable[[], Optional[Dict[str, Any]]]] = None,
+              **kwargs) -> Dict[str, Any]:
+        """
+        经过限流器调用Notion接口，所有线程共享同一个令牌桶
+
+        遇到429/5xx等可重试错误时按Retry-After或带抖动的指数退避重试，
+        重试次数同时受单次调用上限和全局预算限制；网关返回的非JSON错误页(502/503/504)
+        和连接错误同样重试；每次请求的耗时按接口记录到metrics
+
+        Args:
+            method: Notion客户端方法
+            find_existing: 用于非幂等请求(如pages.create)(可选)。请求可能已被Notion执行时
+                (超时、5xx、连接中断)，重试前先调用它查找已写入的结果，找到时直接返回，
+                不再重复请求；429、409和未建立连接的错误一定没有执行，直接重试
+        """
+        import httpx
+        from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+        endpoint = self._endpoint_name(method)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            with self._retry_lock:
+                self.request_count += 1
+            start = time.perf_counter()
+            try:
+                result = method(**kwargs)
+                self.metrics.observe_request("notion", endpoint, time.perf_counter() - start)
+                return result
+
+            except (HTTPResponseError, RequestTimeoutError, httpx.TransportError) as e:
+                self.metrics.observe_request("notion", endpoint, time.perf_counter() - start, error=True)
+                if not self._is_retryable(e) or attempt >= self.max_retries or not self._take_retry_budget():
+                    raise
+                self.metrics.count_retry("notion", endpoint)
+
+                delay = self._get_retry_delay(e, attempt)
+                if getattr(e, "code", None) == "rate_limited":
+                    self.rate_limiter.pause(delay)
+
+                with self._retry_lock:
+                    self.retry_stats["retry_wait"] += delay
+
+                attempt += 1
+                print(f"Notion请求失败({getattr(e, 'code', e)})，{delay:.1f}秒后进行第{attempt}次重试")
+                time.sleep(delay)
+
+                if find_existing is not None and not self._is_unsent(e):
+                    existing = find_existing()
+                    if existing is not None:
+                        print("上一次请求已被Notion执行，不再重复请求")
+                        return existing
+
+    @staticmethod
+    def _endpoint_name(method) -> str:
+        """请求统计用的接口名，如pages.create、databases.query"""
+        owner = type(getattr(method, "__self__", None)).__name__.replace("Endpoint", "").lower()
+        return f"{owner}.{getattr(method, '__name__', 'call')}"
+
+    @staticmethod
+    def is_not_found(error: Exception) -> bool:
+        """判断错误是否为页面或数据库不存在"""
+        from notion_client import APIResponseError
+
+        return isinstance(error, APIResponseError) and error.code == "object_not_found"
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """判断错误是否值得重试"""
+        import httpx
+        from notion_client.errors import RequestTimeoutError
+
+        if isinstance(error, (RequestTimeoutError, httpx.TransportError)):
+            return True
+
+        code = getattr(error, "code", None)
+        code = getattr(code, "value", code)
+        return code in self.RETRYABLE_CODES or getattr(error, "status", 0) >= 500
+
+    @staticmethod
+    def _is_unsent(error: Exception) -> bool:
+        """判断失败的请求是否一定没有被Notion执行：被限流、冲突，或连接没有建立"""
+        import httpx
+        from notion_client.errors import RequestTimeoutError
+
+        code = getattr(error, "code", None)
+        code = getattr(code, "value", code)
+        if code in ("rate_limited", "conflict_error"):
+            return True
+        if isinstance(error, RequestTimeoutError):
+            # notion_client把httpx的超时转换为RequestTimeoutError，原异常保留在__context__中
+            error = error.__context__
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+    def _take_retry_budget(self) -> bool:
+        """从全局重试预算中扣除一次并计数，预算耗尽时返回False"""
+        with self._retry_lock:
+            if self.retry_stats["retries"] >= self.retry_budget:
+                return False
+            self.retry_stats["retries"] += 1
+            return True
+
+    def _get_retry_delay(self, error: Exception, attempt: int) -> float:
+        """计算重试等待时间，优先使用Retry-After响应头"""
+        headers = getattr(error, "headers", None) or {}
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), self.RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+
+        backoff = min(self.RETRY_BASE_DELAY * (2 ** attempt), self.RETRY_MAX_DELAY)
+        return random.uniform(backoff / 2, backoff)
 
     def create_database(self, parent_page_id: str, database_name: str = "豆瓣电影") -> str:
         """创建Notion数据库"""
         try:
             properties = self._get_properties_template()
 
-            database = self.notion.databases.create(
+            database = self._call(
+                self.notion.databases.create,
                 parent={"type": "page_id", "page_id": parent_page_id},
                 title=[{"type": "text", "text": {"content": database_name}}],
                 properties=properties
@@ -52,19 +234,43 @@ class NotionAPI:
             "评分日期": {"date": {}}
         }
 
-    def query_database(self) -> List[Dict[str, Any]]:
-        """查询Notion数据库"""
+    def query_database(self,
+                       filter: Optional[Dict[str, Any]] = None,
+                       properties: Optional[List[str]] = None,
+                       page_size: int = 100) -> List[Dict[str, Any]]:
+        """
+        查询Notion数据库
+
+        Args:
+            filter: 服务端过滤条件(可选)
+            properties: 只保留的属性名称列表(可选)，同时作为服务端投影条件
+            page_size: 每页条数，Notion上限为100
+
+        Returns:
+            页面列表
+        """
         try:
             results = []
             start_cursor = None
 
+            query_kwargs = {"page_size": page_size}
+            if filter:
+                query_kwargs["filter"] = filter
+            if properties:
+                query_kwargs["filter_properties"] = self._resolve_property_ids(properties)
+
             while True:
-                response = self.notion.databases.query(
+                response = self._call(
+                    self.notion.databases.query,
                     database_id=self.database_id,
-                    start_cursor=start_cursor
+                    start_cursor=start_cursor,
+                    **query_kwargs
                 )
 
-                results.extend(response.get("results", []))
+                for page in response.get("results", []):
+                    if properties:
+                        page = self._project_page(page, properties)
+                    results.append(page)
 
                 if not response.get("has_more"):
                     break
@@ -73,21 +279,139 @@ class NotionAPI:
 
             return results
 
-        except APIResponseError as e:
-            if e.code == "object_not_found":
+        except Exception as e:
+            if self.is_not_found(e):
                 print(f"数据库不存在，请检查NOTION_DATABASE_ID配置")
             raise
 
+    def query_by_douban_ids(self,
+                            douban_ids: List[str],
+                            properties: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        按豆瓣ID在服务端过滤查询，返回 豆瓣ID -> 页面 的映射
+
+        Args:
+            douban_ids: 待查询的豆瓣ID列表，按每批100个拼成or条件
+            properties: 只保留的属性名称列表(可选)，豆瓣ID属性总会保留
+
+        Returns:
+            已存在于数据库中的豆瓣ID及其页面
+        """
+        if properties and "豆瓣ID" not in properties:
+            properties = ["豆瓣ID"] + list(properties)
+
+        ids = list(dict.fromkeys(i for i in douban_ids if i))
+        found = {}
+
+        for start in range(0, len(ids), self.FILTER_BATCH_SIZE):
+            batch = ids[start:start + self.FILTER_BATCH_SIZE]
+            conditions = [
+                {"property": "豆瓣ID", "rich_text": {"equals": douban_id}}
+                for douban_id in batch
+            ]
+            filter = conditions[0] if len(conditions) == 1 else {"or": conditions}
+
+            for page in self.query_database(filter=filter, properties=properties):
+                douban_id = self._extract_douban_id(page)
+                if douban_id:
+                    found[douban_id] = {
+                        "id": page["id"],
+                        "properties": page.get("properties", {})
+                    }
+
+        return found
+
+    def _resolve_property_ids(self, names: List[str]) -> List[str]:
+        """将属性名称转换为Notion属性ID，用于filter_properties投影"""
+        if self._property_ids is None:
+            self._property_ids = {
+                name: prop.get("id", name)
+                for name, prop in self._get_schema().items()
+            }
+        return [self._property_ids.get(name, name) for name in names]
+
+    def _get_schema(self) -> Dict[str, Any]:
+        """读取数据库属性结构，只请求一次"""
+        if self._schema is None:
+            database = self._call(self.notion.databases.retrieve, database_id=self.database_id)
+            self._schema = database.get("properties", {})
+        return self._schema
+
+    def ensure_select_options(self, movies: Iterable[DoubanMovie]) -> int:
+        """
+        把电影中出现、数据库结构里还没有的多选选项一次性加入数据库
+
+        写入页面时遇到新选项，Notion会在写入过程中修改数据库结构，并发写入时既慢又容易冲突，
+        因此在写入之前用一次databases.update补齐。失败时只打印错误，页面写入仍会自动创建选项
+
+        Returns:
+            新增的选项数
+        """
+        if self._select_options is None:
+            schema = self._get_schema()
+            self._select_options = {
+                name: {
+                    option["name"]
+                    for option in schema.get(name, {}).get("multi_select", {}).get("options", [])
+                }
+                for name in self.MULTI_SELECT_FIELDS
+            }
+
+        missing: Dict[str, List[str]] = {}
+        for movie in movies:
+            for name, field in self.MULTI_SELECT_FIELDS.items():
+                for value in getattr(movie, field):
+                    if value not in self._select_options[name] and value not in missing.get(name, ()):
+                        missing.setdefault(name, []).append(value)
+
+        if not missing:
+            return 0
+
+        properties = {
+            name: {
+                "multi_select": {
+                    "options": [{"name": option} for option in sorted(self._select_options[name])]
+                               + [{"name": option} for option in values]
+                }
+            }
+            for name, values in missing.items()
+        }
+        try:
+            self._call(self.notion.databases.update, database_id=self.database_id, properties=properties)
+        except Exception as e:
+            print(f"预先添加多选选项失败: {e}")
+            return 0
+
+        for name, values in missing.items():
+            self._select_options[name].update(values)
+        return sum(len(values) for values in missing.values())
+
+    @staticmethod
+    def _project_page(page: Dict[str, Any], properties: List[str]) -> Dict[str, Any]:
+        """只保留页面中需要的属性，减少内存占用"""
+        page_properties = page.get("properties", {})
+        return {
+            "id": page["id"],
+            "properties": {
+                name: page_properties[name]
+                for name in properties
+                if name in page_properties
+            }
+        }
+
     def add_movie_to_database(self, movie: DoubanMovie) -> Dict[str, Any]:
         """将电影添加到Notion数据库"""
         try:
             properties = self._build_properties(movie)
 
-            page = self.notion.pages.create(
+            page = self._call(
+                self.notion.pages.create,
+                find_existing=lambda: self.query_by_douban_ids([movie.id]).get(movie.id),
                 parent={"type": "database_id", "database_id": self.database_id},
                 properties=properties
             )
 
+            self._update_index(movie.id, page)
             return page
 
         except Exception as e:
@@ -99,25 +423,38 @@ class NotionAPI:
         try:
             properties = self._build_properties(movie)
 
-            page = self.notion.pages.update(
+            page = self._call(
+                self.notion.pages.update,
                 page_id=page_id,
                 properties=properties
             )
 
+            self._update_index(movie.id, page)
             return page
 
         except Exception as e:
             print(f"更新电影到Notion数据库失败: {e}")
             raise
 
+    def archive_page(self, page_id: str, douban_id: Optional[str] = None) -> Dict[str, Any]:
+        """归档(移入回收站)Notion页面，并从索引中移除"""
+        try:
+            page = self._call(
+                self.notion.pages.update,
+                page_id=page_id,
+                archived=True
+            )
+
+            if self._index is not None and douban_id:
+                self._index.pop(douban_id, None)
+            return page
+
+        except Exception as e:
+            print(f"归档Notion页面失败: {e}")
+            raise
+
     def _build_properties(self, movie: DoubanMovie) -> Dict[str, Any]:
         """构建页面属性"""
-        status_mapping = {
-            "watched": "已看",
-            "wish": "想看",
-            "do": "在看"
-        }
-
         properties = {
             "电影名称": {
                 "title": [{"text": {"content": movie.title}}]
@@ -126,7 +463,7 @@ class NotionAPI:
                 "rich_text": [{"text": {"content": movie.id}}]
             },
             "状态": {
-                "select": {"name": status_mapping.get(movie.status, "已看")}
+                "select": {"name": self.STATUS_NAMES.get(movie.status, "已看")}
             },
             "评分": {"number": movie.rating},
             "豆瓣链接": {"url": movie.url},
@@ -167,19 +504,110 @@ class NotionAPI:
 
         return properties
 
+    def properties_hash(self, properties: Dict[str, Any], keys: Optional[List[str]] = None) -> str:
+        """
+        计算属性的内容哈希
+
+        Args:
+            properties: 写入用的属性payload或Notion返回的页面属性
+            keys: 只参与计算的属性名称(可选)，缺失的属性按空值处理
+
+        Returns:
+            规范化属性的sha256十六进制摘要
+        """
+        canonical = self._canonicalize_properties(properties)
+        if keys is not None:
+            canonical = {key: canonical.get(key) for key in keys}
+
+        payload = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def payload_hash(self, movie: DoubanMovie) -> str:
+        """计算电影写入payload的内容哈希"""
+        return self.properties_hash(self._build_properties(movie))
+
+    def has_changes(self, movie: DoubanMovie, page: Dict[str, Any]) -> bool:
+        """比较电影与已有页面的属性哈希，判断是否需要更新"""
+        properties = self._build_properties(movie)
+        keys = sorted(properties)
+        return self.properties_hash(properties, keys) != self.properties_hash(page.get("properties", {}), keys)
+
+    @classmethod
+    def _canonicalize_properties(cls, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """将属性转换为与格式无关的规范值，写入payload与Notion返回结果可直接比较"""
+        return {name: cls.canonical_value(prop) for name, prop in properties.items()}
+
+    @staticmethod
+    def canonical_value(prop: Dict[str, Any]) -> Any:
+        """提取单个属性的规范值"""
+        prop_type = prop.get("type") or next(iter(prop), None)
+        value = prop.get(prop_type)
+
+        if prop_type in ("title", "rich_text"):
+            return "".join(
+                item.get("plain_text") or item.get("text", {}).get("content", "")
+                for item in value or []
+            ) or None
+        if prop_type == "select":
+            return value.get("name") if value else None
+        if prop_type == "multi_select":
+            return [option.get("name") for option in value or []] or None
+        if prop_type == "number":
+            return float(value) if value is not None else None
+        if prop_type == "date":
+            return value.get("start") if value else None
+        if prop_type == "files":
+            return [
+                item.get(item.get("type", "external"), {}).get("url")
+                for item in value or []
+            ] or None
+        return value
+
+    def build_index(self) -> Dict[str, Dict[str, Any]]:
+        """分页扫描一次数据库，建立 豆瓣ID -> 页面(id与属性快照) 的索引；数据库尚未创建时索引为空"""
+        index = {}
+        for page in self.query_database() if self.database_id else []:
+            douban_id = self._extract_douban_id(page)
+            if douban_id:
+                index[douban_id] = {
+                    "id": page["id"],
+                    "properties": page.get("properties", {})
+                }
+
+        self._index = index
+        return index
+
+    def get_index(self) -> Dict[str, Dict[str, Any]]:
+        """获取豆瓣ID索引，尚未建立时先扫描数据库"""
+        if self._index is None:
+            return self.build_index()
+        return self._index
+
+    def _update_index(self, douban_id: str, page: Dict[str, Any]):
+        """写入成功后就地更新索引"""
+        if self._index is None or not douban_id:
+            return
+        self._index[douban_id] = {
+            "id": page["id"],
+            "properties": page.get("properties", {})
+        }
+
+    @staticmethod
+    def _extract_douban_id(page: Dict[str, Any]) -> str:
+        """从页面属性中提取豆瓣ID"""
+        douban_id_prop = page.get("properties", {}).get("豆瓣ID", {})
+        if douban_id_prop.get("type") == "rich_text":
+            rich_text = douban_id_prop.get("rich_text", [])
+            if rich_text:
+                return rich_text[0].get("text", {}).get("content", "")
+        return ""
+
     def get_movie_by_douban_id(self, douban_id: str) -> Optional[Dict[str, Any]]:
         """根据豆瓣ID查询电影"""
         try:
-            results = self.query_database()
-
-            for page in results:
-                douban_id_prop = page.get("properties", {}).get("豆瓣ID", {})
-                if douban_id_prop.get("type") == "rich_text":
-                    rich_text = douban_id_prop.get("rich_text", [])
-                    if rich_text and rich_text[0].get("text", {}).get("content") == douban_id:
-                        return page
-
-            return None
+            if self._index is not None:
+                return self._index.get(douban_id)
+            return self.query_by_douban_ids([douban_id]).get(douban_id)
 
         except Exception as e:
             print(f"根据豆瓣ID查询电影失败: {e}")
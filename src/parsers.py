@@ -0,0 +1,404 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from .models import DoubanMovie
+
+TOTAL_PATTERN = re.compile(r"/\s*(\d+)")
+DATE_PATTERN = re.compile(r"\d{4}(?:-\d{2}){0,2}")
+NUMBER_PATTERN = re.compile(r"\d+")
+
+
+class PageParser:
+    """豆瓣页面解析器基类，子类只负责从HTML中取出原始字段"""
+
+    name = ""
+
+    def parse(self, html: str, status: str) -> Tuple[List[DoubanMovie], Optional[int]]:
+        """
+        解析列表页
+
+        Args:
+            html: 页面HTML
+            status: 电影状态
+
+        Returns:
+            (电影列表, 条目总数)，页面中没有总数信息时总数为None
+        """
+        raise NotImplementedError
+
+    def parse_detail(self, html: str) -> Dict[str, Any]:
+        """
+        解析电影详情页
+
+        Args:
+            html: 详情页HTML
+
+        Returns:
+            包含original_title、genres、directors、casts、release_date、duration、summary的字典
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _build_detail(fields: Dict[str, Any]) -> Dict[str, Any]:
+        """根据各解析器取出的详情页原始字段构建规范化的详情数据"""
+        release_date = ""
+        for text in fields["release_dates"]:
+            match = DATE_PATTERN.search(text)
+            if match:
+                release_date = match.group(0)
+                break
+
+        duration = 0
+        match = NUMBER_PATTERN.search(fields["runtime"] or "")
+        if match:
+            duration = int(match.group(0))
+
+        summary_lines = [line.strip() for line in (fields["summary"] or "").splitlines()]
+
+        return {
+            "original_title": (fields["itemreviewed"] or "").strip(),
+            "genres": [genre.strip() for genre in fields["genres"] if genre.strip()],
+            "directors": [director.strip() for director in fields["directors"] if director.strip()],
+            "casts": [cast.strip() for cast in fields["casts"] if cast.strip()],
+            "release_date": release_date,
+            "duration": duration,
+            "summary": "\n".join(line for line in summary_lines if line),
+        }
+
+    @staticmethod
+    def _parse_total(text: Optional[str]) -> Optional[int]:
+        """从"1-15 / 1234"形式的计数文本中取出总数"""
+        if not text:
+            return None
+        match = TOTAL_PATTERN.search(text)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _build_movie(fields: Dict[str, Any], status: str) -> Optional[DoubanMovie]:
+        """根据各解析器取出的原始字段构建电影对象，保证所有解析器输出一致"""
+        try:
+            url = fields["url"]
+            douban_id = url.split("/")[-2] if url else ""
+
+            info_text = fields["intro"]
+            year = ""
+            regions = []
+            directors = []
+            if info_text:
+                parts = [p.strip() for p in info_text.split("/") if p.strip()]
+                if len(parts) >= 1:
+                    year = parts[0]
+                if len(parts) >= 2:
+                    regions = [r.strip() for r in parts[1].split(",")]
+                if len(parts) >= 3:
+                    directors = [d.strip() for d in parts[2].split(",")]
+
+            rating = 0.0
+            for cls in fields["rating_classes"] or []:
+                if cls.startswith("rating"):
+                    try:
+                        rating = int(cls.replace("rating", "")) / 2.0
+                    except ValueError:
+                        pass
+
+            return DoubanMovie(
+                id=douban_id,
+                title=fields["title"],
+                original_title="",
+                year=year,
+                rating=rating,
+                genres=[],
+                directors=directors,
+                casts=[],
+                regions=regions,
+                release_date="",
+                duration=0,
+                url=url,
+                poster_url=fields["poster_url"],
+                summary="",
+                comment=fields["comment"],
+                rating_date=fields["rating_date"],
+                status=status
+            )
+
+        except Exception as e:
+            print(f"解析电影条目失败: {e}")
+            return None
+
+
+class HtmlParserBackend(PageParser):
+    """基于BeautifulSoup和标准库html.parser的解析器，无额外依赖"""
+
+    name = "html.parser"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def parse(self, html: str, status: str) -> Tuple[List[DoubanMovie], Optional[int]]:
+        soup = self._soup(html, "html.parser")
+
+        movies = []
+        for item in soup.find_all("div", class_="item"):
+            fields = self._extract_fields(item)
+            movie = self._build_movie(fields, status) if fields else None
+            if movie:
+                movies.append(movie)
+
+        subject_num = soup.find("span", class_="subject-num")
+        return movies, self._parse_total(subject_num.text if subject_num else None)
+
+    def parse_detail(self, html: str) -> Dict[str, Any]:
+        soup = self._soup(html, "html.parser")
+
+        def texts(name, **attrs):
+            return [elem.text for elem in soup.find_all(name, attrs=attrs)]
+
+        itemreviewed = soup.find("span", attrs={"property": "v:itemreviewed"})
+        runtime = soup.find("span", attrs={"property": "v:runtime"})
+        summary = soup.find("span", class_="all") or soup.find("span", attrs={"property": "v:summary"})
+
+        return self._build_detail({
+            "itemreviewed": itemreviewed.text if itemreviewed else "",
+            "genres": texts("span", property="v:genre"),
+            "directors": texts("a", rel="v:directedBy"),
+            "casts": texts("a", rel="v:starring"),
+            "release_dates": texts("span", property="v:initialReleaseDate"),
+            "runtime": (runtime.get("content") or runtime.text) if runtime else "",
+            "summary": summary.text if summary else "",
+        })
+
+    @staticmethod
+    def _extract_fields(item) -> Optional[Dict[str, Any]]:
+        """取出单个条目的原始字段，缺少标题链接时返回None"""
+        title_elem = item.find("li", class_="title")
+        title_link = title_elem.find("a") if title_elem else None
+        if not title_link:
+            return None
+
+        info_elem = item.find("li", class_="intro")
+        rating_elem = item.find("span", class_="rating5-t")
+        date_elem = item.find("span", class_="date")
+        comment_elem = item.find("span", class_="comment")
+        pic_elem = item.find("a", class_="nbg")
+        img = pic_elem.find("img") if pic_elem else None
+
+        return {
+            "title": title_link.text.strip(),
+            "url": title_link.get("href", ""),
+            "intro": info_elem.text.strip() if info_elem else "",
+            "rating_classes": rating_elem.get("class", []) if rating_elem else [],
+            "rating_date": date_elem.text.strip() if date_elem else "",
+            "comment": comment_elem.text.strip() if comment_elem else "",
+            "poster_url": img.get("src", "") if img else "",
+        }
+
+
+class LxmlBackend(PageParser):
+    """基于lxml和预编译XPath的解析器"""
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html as lxml_html
+
+        def has_class(tag: str, cls: str) -> str:
+            return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+        self._fromstring = lxml_html.fromstring
+        self._items = etree.XPath(f"//{has_class('div', 'item')}")
+        self._subject_num = etree.XPath(f"(//{has_class('span', 'subject-num')})[1]")
+        self._title = etree.XPath(f"(.//{has_class('li', 'title')})[1]")
+        self._link = etree.XPath("(.//a)[1]")
+        self._intro = etree.XPath(f"(.//{has_class('li', 'intro')})[1]")
+        self._rating = etree.XPath(f"(.//{has_class('span', 'rating5-t')})[1]")
+        self._date = etree.XPath(f"(.//{has_class('span', 'date')})[1]")
+        self._comment = etree.XPath(f"(.//{has_class('span', 'comment')})[1]")
+        self._pic = etree.XPath(f"(.//{has_class('a', 'nbg')})[1]")
+        self._img = etree.XPath("(.//img)[1]")
+
+        self._itemreviewed = etree.XPath("(//span[@property='v:itemreviewed'])[1]")
+        self._genres = etree.XPath("//span[@property='v:genre']")
+        self._directors = etree.XPath("//a[@rel='v:directedBy']")
+        self._casts = etree.XPath("//a[@rel='v:starring']")
+        self._release_dates = etree.XPath("//span[@property='v:initialReleaseDate']")
+        self._runtime = etree.XPath("(//span[@property='v:runtime'])[1]")
+        self._summary = etree.XPath(f"(//{has_class('span', 'all')} | //span[@property='v:summary'])")
+
+    def parse(self, html: str, status: str) -> Tuple[List[DoubanMovie], Optional[int]]:
+        if not html.strip():
+            return [], None
+        root = self._fromstring(html)
+
+        movies = []
+        for item in self._items(root):
+            fields = self._extract_fields(item)
+            movie = self._build_movie(fields, status) if fields else None
+            if movie:
+                movies.append(movie)
+
+        subject_num = self._first(self._subject_num, root)
+        return movies, self._parse_total(subject_num.text_content() if subject_num is not None else None)
+
+    def parse_detail(self, html: str) -> Dict[str, Any]:
+        if not html.strip():
+            return self._build_detail({
+                "itemreviewed": "", "genres": [], "directors": [], "casts": [],
+                "release_dates": [], "runtime": "", "summary": "",
+            })
+        root = self._fromstring(html)
+
+        runtime = self._first(self._runtime, root)
+        summaries = self._summary(root)
+        summary = next((elem for elem in summaries if "all" in elem.get("class", "").split()), None)
+        if summary is None and summaries:
+            summary = summaries[0]
+
+        return self._build_detail({
+            "itemreviewed": self._text(self._itemreviewed, root),
+            "genres": [elem.text_content() for elem in self._genres(root)],
+            "directors": [elem.text_content() for elem in self._directors(root)],
+            "casts": [elem.text_content() for elem in self._casts(root)],
+            "release_dates": [elem.text_content() for elem in self._release_dates(root)],
+            "runtime": (runtime.get("content") or runtime.text_content()) if runtime is not None else "",
+            "summary": summary.text_content() if summary is not None else "",
+        })
+
+    @staticmethod
+    def _first(xpath, node):
+        """取XPath的第一个结果"""
+        result = xpath(node)
+        return result[0] if result else None
+
+    def _text(self, xpath, node) -> str:
+        elem = self._first(xpath, node)
+        return elem.text_content().strip() if elem is not None else ""
+
+    def _extract_fields(self, item) -> Optional[Dict[str, Any]]:
+        """取出单个条目的原始字段，缺少标题链接时返回None"""
+        title_elem = self._first(self._title, item)
+        title_link = self._first(self._link, title_elem) if title_elem is not None else None
+        if title_link is None:
+            return None
+
+        rating_elem = self._first(self._rating, item)
+        pic_elem = self._first(self._pic, item)
+        img = self._first(self._img, pic_elem) if pic_elem is not None else None
+
+        return {
+            "title": title_link.text_content().strip(),
+            "url": title_link.get("href", ""),
+            "intro": self._text(self._intro, item),
+            "rating_classes": rating_elem.get("class", "").split() if rating_elem is not None else [],
+            "rating_date": self._text(self._date, item),
+            "comment": self._text(self._comment, item),
+            "poster_url": img.get("src", "") if img is not None else "",
+        }
+
+
+class SelectolaxBackend(PageParser):
+    """基于selectolax(lexbor)和CSS选择器的解析器"""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def parse(self, html: str, status: str) -> Tuple[List[DoubanMovie], Optional[int]]:
+        tree = self._parser(html)
+
+        movies = []
+        for item in tree.css("div.item"):
+            fields = self._extract_fields(item)
+            movie = self._build_movie(fields, status) if fields else None
+            if movie:
+                movies.append(movie)
+
+        subject_num = tree.css_first("span.subject-num")
+        return movies, self._parse_total(subject_num.text() if subject_num else None)
+
+    def parse_detail(self, html: str) -> Dict[str, Any]:
+        tree = self._parser(html)
+
+        def texts(selector):
+            return [elem.text() for elem in tree.css(selector)]
+
+        runtime = tree.css_first('span[property="v:runtime"]')
+        summary = tree.css_first("span.all") or tree.css_first('span[property="v:summary"]')
+
+        return self._build_detail({
+            "itemreviewed": self._text(tree, 'span[property="v:itemreviewed"]'),
+            "genres": texts('span[property="v:genre"]'),
+            "directors": texts('a[rel="v:directedBy"]'),
+            "casts": texts('a[rel="v:starring"]'),
+            "release_dates": texts('span[property="v:initialReleaseDate"]'),
+            "runtime": (runtime.attributes.get("content") or runtime.text()) if runtime else "",
+            "summary": summary.text() if summary else "",
+        })
+
+    @staticmethod
+    def _text(item, selector: str) -> str:
+        elem = item.css_first(selector)
+        return elem.text().strip() if elem else ""
+
+    def _extract_fields(self, item) -> Optional[Dict[str, Any]]:
+        """取出单个条目的原始字段，缺少标题链接时返回None"""
+        title_elem = item.css_first("li.title")
+        title_link = title_elem.css_first("a") if title_elem else None
+        if not title_link:
+            return None
+
+        rating_elem = item.css_first("span.rating5-t")
+        pic_elem = item.css_first("a.nbg")
+        img = pic_elem.css_first("img") if pic_elem else None
+
+        return {
+            "title": title_link.text().strip(),
+            "url": title_link.attributes.get("href") or "",
+            "intro": self._text(item, "li.intro"),
+            "rating_classes": (rating_elem.attributes.get("class") or "").split() if rating_elem else [],
+            "rating_date": self._text(item, "span.date"),
+            "comment": self._text(item, "span.comment"),
+            "poster_url": (img.attributes.get("src") or "") if img else "",
+        }
+
+
+BACKENDS = {
+    SelectolaxBackend.name: SelectolaxBackend,
+    LxmlBackend.name: LxmlBackend,
+    HtmlParserBackend.name: HtmlParserBackend,
+}
+
+
+def available_backends() -> List[str]:
+    """返回当前环境可用的解析器名称，按速度从快到慢排列"""
+    names = []
+    for name, backend in BACKENDS.items():
+        try:
+            backend()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_parser(name: str = "auto") -> PageParser:
+    """
+    获取列表页解析器
+
+    Args:
+        name: 解析器名称，auto时依次尝试selectolax、lxml，都不可用时使用html.parser
+
+    Returns:
+        解析器实例
+    """
+    if name == "auto":
+        for backend in BACKENDS.values():
+            try:
+                return backend()
+            except ImportError:
+                continue
+
+    if name not in BACKENDS:
+        raise ValueError(f"Invalid HTML_PARSER: {name}, must be one of: auto, {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,164 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlparse
+from .concurrency import ordered_bounded_map
+from .models import DoubanMovie
+
+
+class PosterMirror:
+    """
+    海报镜像，把豆瓣海报下载到按sha256命名的本地目录，Notion中改用稳定镜像地址
+
+    豆瓣海报(doubanio.com)有防盗链，在Notion中经常无法显示。下载的海报保存为
+    <目录>/<sha256><扩展名>，内容相同的海报只保存一份；该目录需要由用户发布到
+    mirror_url对应的静态地址(如GitHub Pages、对象存储)。原始地址与文件的对应关系记录在
+    目录下的index.db中，已镜像过的海报不再下载
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS posters (
+            url TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            stored_at REAL NOT NULL
+        );
+    """
+    REFERER = "https://movie.douban.com/"
+    JPEG_QUALITY = 85
+
+    def __init__(self, douban_api, poster_dir: str, mirror_url: str,
+                 max_workers: int = 4, max_width: int = 0):
+        """
+        初始化海报镜像
+
+        Args:
+            douban_api: DoubanAPI实例，复用其会话和请求统计
+            poster_dir: 海报缓存目录
+            mirror_url: 发布poster_dir的静态地址，Notion中的海报地址为 mirror_url/<文件名>
+            max_workers: 并发下载线程数
+            max_width: 海报最大宽度(像素)，超过时等比缩小，0为保持原尺寸；需要安装Pillow
+        """
+        self.douban_api = douban_api
+        self.poster_dir = poster_dir
+        self.mirror_url = mirror_url.rstrip("/")
+        self.max_workers = max(1, max_workers)
+        self.max_width = max(0, max_width)
+        self.stats = {"cached": 0, "downloaded": 0, "deduped": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._warned_resize = False
+
+        os.makedirs(poster_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(poster_dir, "index.db"), check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+
+    def mirror(self, movies: Iterable[DoubanMovie]) -> Iterator[DoubanMovie]:
+        """
+        按原顺序逐部产出换成镜像海报地址的电影
+
+        已镜像的海报只查本地索引，不发起请求；同时在途的下载数限制为线程数的两倍
+        """
+        for _, future in ordered_bounded_map(self.mirror_movie, movies, self.max_workers):
+            yield future.result()
+
+    def mirror_movie(self, movie: DoubanMovie) -> DoubanMovie:
+        """镜像单部电影的海报，失败时保留原地址，下次运行重试"""
+        url = movie.poster_url
+        if not url or url.startswith(f"{self.mirror_url}/"):
+            return movie
+
+        filename = self._lookup(url)
+        if filename:
+            self._count("cached")
+        else:
+            try:
+                with self.douban_api.metrics.stage("poster"):
+                    filename = self._store(url, self._resize(self._download(url)))
+            except Exception as e:
+                self._count("failed")
+                print(f"镜像海报失败 {movie.title}: {e}")
+                return movie
+
+        movie.poster_url = f"{self.mirror_url}/{filename}"
+        return movie
+
+    def _download(self, url: str) -> bytes:
+        """带Referer下载海报，绕过豆瓣图片的防盗链"""
+        metrics = self.douban_api.metrics
+        start = time.perf_counter()
+        try:
+            response = self.douban_api.session.get(url, headers={"Referer": self.REFERER}, timeout=30)
+            response.raise_for_status()
+        except Exception:
+            metrics.observe_request("poster", "image", time.perf_counter() - start, error=True)
+            raise
+        metrics.observe_request("poster", "image", time.perf_counter() - start)
+        metrics.add_bytes("poster", len(response.content))
+
+        if not response.headers.get("Content-Type", "image/").startswith("image/"):
+            raise ValueError(f"不是图片: {response.headers.get('Content-Type')}")
+        return response.content
+
+    def _resize(self, data: bytes) -> bytes:
+        """宽度超过max_width时等比缩小，未安装Pillow或无法识别图片时返回原图"""
+        if not self.max_width:
+            return data
+
+        try:
+            from PIL import Image
+        except ImportError:
+            if not self._warned_resize:
+                self._warned_resize = True
+                print("未安装Pillow，海报按原尺寸保存(pip install Pillow)")
+            return data
+
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= self.max_width:
+                return data
+            image_format = image.format
+            height = round(image.height * self.max_width / image.width)
+            resized = image.resize((self.max_width, height), Image.LANCZOS)
+            if image_format == "JPEG" and resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+            output = io.BytesIO()
+            resized.save(output, format=image_format, quality=self.JPEG_QUALITY)
+        return output.getvalue()
+
+    def _store(self, url: str, data: bytes) -> str:
+        """按内容的sha256保存海报，已有相同内容时只记录索引"""
+        extension = os.path.splitext(urlparse(url).path)[1].lower() or ".jpg"
+        filename = f"{hashlib.sha256(data).hexdigest()}{extension}"
+        path = os.path.join(self.poster_dir, filename)
+
+        if os.path.exists(path):
+            self._count("deduped")
+        else:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._count("downloaded")
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO posters (url, filename, size, stored_at) VALUES (?, ?, ?, ?)",
+                (url, filename, len(data), time.time())
+            )
+        return filename
+
+    def _lookup(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM posters WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def close(self):
+        """关闭索引数据库"""
+        self._conn.close()
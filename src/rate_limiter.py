@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器，按平均速率发放令牌并允许一定突发"""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数(平均请求速率)
+            capacity: 桶容量(允许的最大突发请求数)
+        """
+        if rate <= 0:
+            raise ValueError(f"Invalid rate: {rate}, must be greater than 0")
+
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        获取令牌，令牌不足时阻塞等待
+
+        Returns:
+            本次等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+
+                delay = (tokens - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """清空令牌并在指定秒数内暂停发放，用于服务端要求退避时让所有线程一起等待"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = 0
+            self._updated_at = max(self._updated_at, now + seconds)
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    按AIMD(加性增、乘性减)调整速率的令牌桶
+
+    请求成功时速率加上固定步长，被限流或封禁时速率乘以退避系数，并暂停发放令牌。
+    一次退避之后的一个请求间隔内不再重复退避，避免并发请求同时失败时速率被连续减半
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float, max_rate: float,
+                 increase: float = 0.05, decrease: float = 0.5):
+        """
+        初始化限流器
+
+        Args:
+            rate: 初始速率(次/秒)
+            capacity: 桶容量(允许的最大突发请求数)
+            min_rate: 速率下限
+            max_rate: 速率上限
+            increase: 每次成功增加的速率
+            decrease: 每次退避时速率乘以的系数
+        """
+        if min_rate <= 0 or max_rate < min_rate:
+            raise ValueError(f"Invalid rate range: {min_rate}-{max_rate}")
+
+        super().__init__(min(max(rate, min_rate), max_rate), capacity)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._last_decrease = float("-inf")
+
+    def _set_rate(self, rate: float):
+        """按旧速率结算已积累的令牌后切换速率，调用方需持有锁"""
+        now = time.monotonic()
+        if now > self._updated_at:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+        self.rate = rate
+
+    def on_success(self):
+        """请求成功，加性提高速率"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._set_rate(min(self.max_rate, self.rate + self.increase))
+
+    def on_throttle(self, delay: float = 0.0) -> bool:
+        """
+        请求被限流或封禁，乘性降低速率并让所有线程暂停delay秒
+
+        Returns:
+            本次是否降低了速率(距上次退避不足一个请求间隔时只暂停)
+        """
+        with self._lock:
+            now = time.monotonic()
+            decreased = now - self._last_decrease >= 1 / self.rate
+            if decreased:
+                self._set_rate(max(self.min_rate, self.rate * self.decrease))
+                self._last_decrease = now
+
+        if delay > 0:
+            self.pause(delay)
+        return decreased
+
+
+class FairShare:
+    """
+    在多个租户之间轮流分配同一个限流器的令牌
+
+    同一时刻只有一个线程在底层限流器上等待，等待中的租户按轮转顺序依次获得令牌，
+    某个租户的并发线程再多也不会挤占其他租户的份额
+    """
+
+    def __init__(self, limiter: TokenBucket):
+        self.limiter = limiter
+        self._cond = threading.Condition()
+        self._turns: "deque[str]" = deque()
+        self._waiting: Dict[str, int] = {}
+        self._busy = False
+
+    def for_tenant(self, tenant: str) -> "TenantLimiter":
+        """返回指定租户使用的限流器"""
+        return TenantLimiter(self, tenant)
+
+    def acquire(self, tenant: str) -> float:
+        """轮到该租户时从底层限流器获取令牌，返回等待的秒数"""
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[tenant] = self._waiting.get(tenant, 0) + 1
+            if tenant not in self._turns:
+                self._turns.append(tenant)
+            while self._busy or self._turns[0] != tenant:
+                self._cond.wait()
+            self._busy = True
+
+        try:
+            self.limiter.acquire()
+        finally:
+            with self._cond:
+                self._busy = False
+                self._turns.popleft()
+                self._waiting[tenant] -= 1
+                if self._waiting[tenant]:
+                    self._turns.append(tenant)
+                self._cond.notify_all()
+        return time.monotonic() - start
+
+
+class TenantLimiter:
+    """FairShare中单个租户的视图，acquire按轮转排队，其余方法(pause、on_throttle等)直接作用于共享的限流器"""
+
+    def __init__(self, share: FairShare, tenant: str):
+        self._share = share
+        self.tenant = tenant
+
+    def acquire(self) -> float:
+        return self._share.acquire(self.tenant)
+
+    def __getattr__(self, name: str):
+        return getattr(self._share.limiter, name)
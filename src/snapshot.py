@@ -0,0 +1,76 @@
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from .models import DoubanMovie
+
+
+def write_snapshot(movies: Iterable[DoubanMovie], path: str,
+                   is_complete: Optional[Callable[[], bool]] = None) -> int:
+    """
+    边抓取边把电影逐行写入JSONL快照，每行一个DoubanMovie.to_dict()
+
+    先写入path.partial，全部写完后再替换为path，中断时不会留下看似完整的快照
+
+    Args:
+        movies: 要写入的电影
+        path: 快照文件路径
+        is_complete: 写完后调用(可选)，返回False时保留path.partial，不替换为path
+
+    Returns:
+        写入的电影数
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.partial"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for movie in movies:
+            f.write(json.dumps(movie.to_dict(), ensure_ascii=False) + "\n")
+            count += 1
+    if is_complete is None or is_complete():
+        os.replace(tmp_path, path)
+    return count
+
+
+def is_partial_snapshot(path: str) -> bool:
+    """是否为未完成的快照(抓取中断或不完整时留下的.partial文件)"""
+    return path.endswith(".partial")
+
+
+def read_snapshot(path: str) -> Iterator[DoubanMovie]:
+    """逐行读取JSONL快照，跳过空行"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield DoubanMovie.from_dict(json.loads(line))
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"快照格式错误 {path}:{line_number}: {e}") from e
+
+
+def diff_snapshots(path: str, previous_path: str,
+                   stats: Optional[Dict[str, Any]] = None) -> Iterator[DoubanMovie]:
+    """
+    只产出与上一份快照相比新增或内容变化的电影
+
+    上一份快照只在内存中保留豆瓣ID和内容哈希；读完当前快照后在stats中记录
+    changed(新增或变化)、unchanged和removed(上一份中有、当前快照中没有)的数量
+
+    Args:
+        path: 当前快照
+        previous_path: 上一份已成功推送的快照
+        stats: 接收比较结果计数的字典(可选)
+    """
+    previous = {movie.id: movie.content_hash() for movie in read_snapshot(previous_path)}
+    counts = {"changed": 0, "unchanged": 0, "removed": 0}
+
+    for movie in read_snapshot(path):
+        if previous.pop(movie.id, None) == movie.content_hash():
+            counts["unchanged"] += 1
+            continue
+        counts["changed"] += 1
+        yield movie
+
+    counts["removed"] = len(previous)
+    if stats is not None:
+        stats.update(counts)
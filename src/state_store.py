@@ -0,0 +1,153 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class StateStore:
+    """本地SQLite同步状态，记录豆瓣ID与Notion页面的对应关系"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS movies (
+            douban_id TEXT PRIMARY KEY,
+            page_id TEXT NOT NULL,
+            payload_hash TEXT,
+            last_seen REAL NOT NULL,
+            status TEXT
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path: str):
+        """
+        打开状态文件，不存在时自动创建
+
+        Args:
+            path: SQLite文件路径
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+        self._entries = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """启动时一次性读入全部映射"""
+        rows = self._conn.execute(
+            "SELECT douban_id, page_id, payload_hash, last_seen, status FROM movies"
+        ).fetchall()
+        return {
+            douban_id: {
+                "page_id": page_id,
+                "payload_hash": payload_hash,
+                "last_seen": last_seen,
+                "status": status
+            }
+            for douban_id, page_id, payload_hash, last_seen, status in rows
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, douban_id: str) -> Optional[Dict[str, Any]]:
+        """获取豆瓣ID对应的状态"""
+        return self._entries.get(douban_id)
+
+    def upsert(self, douban_id: str, page_id: str, payload_hash: Optional[str], status: str):
+        """写入成功后记录单条映射，每次调用都是一个独立事务"""
+        self.upsert_many([(douban_id, page_id, payload_hash, status)])
+
+    def upsert_many(self, entries: Iterable[Tuple[str, str, Optional[str], str]]):
+        """在同一事务中记录多条映射"""
+        now = time.time()
+        rows = [(douban_id, page_id, payload_hash, now, status) for douban_id, page_id, payload_hash, status in entries]
+        if not rows:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO movies (douban_id, page_id, payload_hash, last_seen, status) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(douban_id) DO UPDATE SET page_id = excluded.page_id, "
+                "payload_hash = excluded.payload_hash, last_seen = excluded.last_seen, status = excluded.status",
+                rows
+            )
+            for douban_id, page_id, payload_hash, last_seen, status in rows:
+                self._entries[douban_id] = {
+                    "page_id": page_id,
+                    "payload_hash": payload_hash,
+                    "last_seen": last_seen,
+                    "status": status
+                }
+
+    def delete(self, douban_ids: Iterable[str]):
+        """删除映射"""
+        ids = [douban_id for douban_id in douban_ids if douban_id in self._entries]
+        if not ids:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM movies WHERE douban_id = ?", [(i,) for i in ids])
+            for douban_id in ids:
+                self._entries.pop(douban_id, None)
+
+    def reconcile(self, pages: Dict[str, str], database_id: Optional[str] = None):
+        """
+        以Notion中的实际页面为准校正状态
+
+        Args:
+            pages: 豆瓣ID -> Notion页面ID
+            database_id: 扫描的Notion数据库ID，记录后据此判断状态属于哪个数据库
+        """
+        stale = [
+            douban_id for douban_id, entry in self._entries.items()
+            if pages.get(douban_id) != entry["page_id"]
+        ]
+        self.delete(stale)
+        if database_id:
+            self.set_meta("database_id", database_id)
+        self.set_meta("last_reconciled", str(time.time()))
+
+    def needs_reconcile(self, max_age_days: float, database_id: Optional[str] = None) -> bool:
+        """
+        状态为空、不属于指定的数据库或距上次校正超过指定天数时需要重新校正
+
+        未记录数据库ID的旧状态也视为不属于该数据库，校正一次后记录
+        """
+        if not self._entries:
+            return True
+        if database_id and not self.belongs_to(database_id):
+            return True
+        if max_age_days <= 0:
+            return False
+
+        last_reconciled = float(self.get_meta("last_reconciled") or 0)
+        return time.time() - last_reconciled > max_age_days * 86400
+
+    def belongs_to(self, database_id: str) -> bool:
+        """状态中的页面ID是否属于指定的Notion数据库"""
+        return self.get_meta("database_id") == database_id
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """读取元数据"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        """写入元数据"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
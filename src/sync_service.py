@@ -1,9 +1,23 @@
+import itertools
 import logging
-from typing import List, Dict, Any
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Set, Tuple
+from .checkpoint import Checkpoint
+from .concurrency import ordered_bounded_map
 from .douban_api import DoubanAPI
+from .enrichment import DetailEnricher
+from .metrics import Metrics
 from .notion_api import NotionAPI
 from .models import DoubanMovie
-from .config import config
+from .posters import PosterMirror
+from .snapshot import diff_snapshots, is_partial_snapshot, read_snapshot, write_snapshot
+from .config import Config
+from .state_store import StateStore
+from .watermark import Watermark, WatermarkStore
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,108 +30,738 @@ logger = logging.getLogger(__name__)
 class SyncService:
     """同步服务类，用于协调豆瓣和Notion之间的数据同步"""
 
-    def __init__(self):
-        self.douban_api = DoubanAPI()
-        self.notion_api = NotionAPI()
-        self.sync_status = config.sync_status
+    def __init__(self, config: Optional[Config] = None, reconcile: bool = False, mirror: Optional[bool] = None,
+                 dry_run: Optional[bool] = None, resume: bool = False):
+        """
+        初始化同步服务
+
+        Args:
+            config: 同步配置，默认从.env文件和环境变量读取
+            reconcile: 是否在本次运行中扫描Notion数据库校正本地同步状态
+            mirror: 是否归档豆瓣上已不存在的电影页面，默认取MIRROR_MODE
+            dry_run: 镜像模式只报告将要归档的页面而不实际归档，默认取MIRROR_DRY_RUN
+            resume: 是否从上次中断运行的检查点继续
+        """
+        self.config = config = config or Config()
+        self.douban_api = DoubanAPI(config)
+        self.notion_api = NotionAPI(config)
+        self.metrics = Metrics()
+        self.douban_api.metrics = self.metrics
+        self.notion_api.metrics = self.metrics
+        self.sync_statuses = config.sync_statuses
+        self.max_workers = max(1, config.notion_workers)
+        self.queue_size = max(1, config.sync_queue_size)
+        self.watermark_store = WatermarkStore(os.path.join(config.state_dir, "watermark.json"))
+        self.state_store = StateStore(os.path.join(config.state_dir, "state.db"))
+        self.reconcile = reconcile
+        self.mirror = config.mirror_mode if mirror is None else mirror
+        self.dry_run = config.mirror_dry_run if dry_run is None else dry_run
+        self.resume = resume
+        self.checkpoint = Checkpoint(os.path.join(config.state_dir, "checkpoint.db"), config.checkpoint_interval)
+        self.planning = False
+        self.plan: Dict[str, List[Dict[str, Any]]] = {}
+        self._checkpointing = False
+        self._source: Optional[str] = None
+        self.enricher = None
+        if config.enrich_details:
+            self.enricher = DetailEnricher(
+                self.douban_api,
+                os.path.join(config.state_dir, "details"),
+                config.detail_workers
+            )
+        self.poster_mirror = None
+        if config.poster_mirror:
+            self.poster_mirror = PosterMirror(
+                self.douban_api,
+                config.poster_dir,
+                config.poster_mirror_url,
+                config.poster_workers,
+                config.poster_max_width
+            )
+        self._use_index = False
+        self._done: Set[str] = set()
+        self._resume_pages: Dict[str, Tuple[int, List[DoubanMovie]]] = {}
+        self._resume_totals: Dict[str, Optional[int]] = {}
+        self._crawled: Dict[str, int] = {}
+        self._resumed = False
 
     def get_douban_movies(self) -> List[DoubanMovie]:
         """根据配置的同步状态获取豆瓣电影列表"""
-        logger.info(f"开始从豆瓣获取{self._get_status_text()}电影...")
-
-        if self.sync_status == "watched":
-            movies = self.douban_api.get_watched_movies()
-        elif self.sync_status == "wish":
-            movies = self.douban_api.get_wish_movies()
-        elif self.sync_status == "do":
-            movies = self.douban_api.get_doing_movies()
-        else:
-            raise ValueError(f"无效的同步状态: {self.sync_status}")
-
-        logger.info(f"成功获取{len(movies)}部{self._get_status_text()}电影")
-        return movies
-
-    def sync_movies(self) -> Dict[str, Any]:
-        """执行电影同步逻辑"""
+        return list(self.iter_douban_movies())
+
+    def iter_douban_movies(self,
+                           stop_when: Optional[Dict[str, Callable[[List[DoubanMovie]], bool]]] = None
+                           ) -> Iterator[DoubanMovie]:
+        """
+        立即在后台线程中开始抓取豆瓣电影，返回从有界队列逐部读取的迭代器
+
+        每个同步状态各用一个抓取线程并行抓取，共用同一个会话和限流器；
+        调用后抓取即开始，可与Notion索引建立并行；队列满时抓取线程阻塞，
+        Notion写入较慢时豆瓣抓取随之放缓。同一部电影只产出一次；
+        每页抓取后记录到检查点，从检查点恢复时先产出已抓取的电影再从下一页继续
+
+        Args:
+            stop_when: 各状态提前停止抓取的条件(可选)，见DoubanAPI.iter_user_movies
+        """
+        self._crawled = {}
+        movie_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        done = object()
+        stop_when = stop_when or {}
+
+        def produce(status: str):
+            count = 0
+            status_text = self._get_status_text(status)
+            try:
+                logger.info(f"开始从豆瓣获取{status_text}电影...")
+                start_page, replayed = self._resume_pages.get(status, (0, []))
+                movies = itertools.chain(replayed, self.douban_api.iter_user_movies(
+                    status=status,
+                    max_pages=self.config.douban_max_pages,
+                    stop_when=stop_when.get(status),
+                    start_page=start_page,
+                    on_page=(
+                        lambda page, page_movies: self.checkpoint.record_page(
+                            status, page, page_movies, self.douban_api.crawl_totals.get(status)
+                        )
+                    ) if self._checkpointing else None,
+                    total=self._resume_totals.get(status)
+                ))
+                if self.enricher:
+                    movies = self.enricher.enrich(movies)
+                if self.poster_mirror:
+                    movies = self.poster_mirror.mirror(movies)
+
+                for movie in movies:
+                    movie_queue.put(movie)
+                    count += 1
+                logger.info(f"成功获取{count}部{status_text}电影")
+                self._crawled[status] = count
+                movie_queue.put(done)
+            except Exception as e:
+                movie_queue.put(e)
+
+        def consume():
+            seen = set()
+            remaining = len(producers)
+            while remaining:
+                item = movie_queue.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                if item.id in seen:
+                    logger.warning(f"电影同时出现在多个列表中，只同步一次: {item.title}")
+                    continue
+                seen.add(item.id)
+                yield item
+
+            for producer in producers:
+                producer.join()
+
+            if self.enricher:
+                enrich_stats = self.enricher.stats
+                logger.info(
+                    f"详情补全: 缓存命中{enrich_stats['cached']}部，"
+                    f"新抓取{enrich_stats['fetched']}部，失败{enrich_stats['failed']}部"
+                )
+            if self.poster_mirror:
+                poster_stats = self.poster_mirror.stats
+                logger.info(
+                    f"海报镜像: 已镜像{poster_stats['cached']}张，新下载{poster_stats['downloaded']}张，"
+                    f"重复内容{poster_stats['deduped']}张，失败{poster_stats['failed']}张"
+                )
+
+        producers = [
+            threading.Thread(target=produce, args=(status,), name=f"douban-crawler-{status}", daemon=True)
+            for status in self.sync_statuses
+        ]
+        for producer in producers:
+            producer.start()
+        return consume()
+
+    def sync_movies(self, movies: Optional[Iterable[DoubanMovie]] = None) -> Dict[str, Any]:
+        """
+        执行电影同步逻辑，豆瓣抓取与Notion写入流水线并行
+
+        Args:
+            movies: 要同步的电影(可选)，如读取自快照；传入时不访问豆瓣，按全量同步处理
+        """
         logger.info("开始执行电影同步...")
 
-        if not config.is_database_configured():
-            if not config.notion_parent_page_id:
+        if not self.config.is_database_configured() and self.planning:
+            logger.info("Notion数据库尚未创建，计划中的电影都将新增")
+        elif not self.config.is_database_configured():
+            if not self.config.notion_parent_page_id:
                 raise ValueError("未配置NOTION_DATABASE_ID或NOTION_PARENT_PAGE_ID")
             logger.info("自动创建Notion数据库...")
-            config.notion_database_id = self.notion_api.create_database(
-                config.notion_parent_page_id,
+            self.config.notion_database_id = self.notion_api.create_database(
+                self.config.notion_parent_page_id,
                 "豆瓣电影"
             )
-            logger.info(f"数据库创建成功: {config.notion_database_id}")
+            self.notion_api.database_id = self.config.notion_database_id
+            logger.info(f"数据库创建成功: {self.config.notion_database_id}")
 
-        douban_movies = self.get_douban_movies()
+        if not self.planning:
+            self._start_checkpoint()
 
-        if config.incremental_sync:
-            return self._incremental_sync(douban_movies)
-        else:
-            return self._full_sync(douban_movies)
+        try:
+            stats = self._run_sync(movies)
+        except BaseException as e:
+            if not self.planning:
+                self.checkpoint.flush()
+                logger.warning("同步中断，进度已保存到检查点，可使用--resume继续")
+                self._write_report({"error": repr(e)})
+            raise
 
-    def _full_sync(self, douban_movies: List[DoubanMovie]) -> Dict[str, Any]:
-        """全量同步"""
-        stats = {"total": len(douban_movies), "added": 0, "updated": 0, "failed": 0}
+        if not self.planning:
+            if stats.get("incomplete"):
+                self.checkpoint.flush()
+                logger.warning("豆瓣列表抓取不完整，检查点已保留，可使用--resume从中断的页面继续")
+            else:
+                self.checkpoint.clear()
+            self._write_report(stats)
+        return stats
 
-        for i, movie in enumerate(douban_movies):
-            logger.info(f"正在处理第{i+1}/{len(douban_movies)}部电影: {movie.title}")
+    def _write_report(self, stats: Dict[str, Any]):
+        """写入JSON运行报告和Prometheus textfile(均可选)，写入失败不影响同步结果"""
+        report = self.metrics.report(stats)
+        try:
+            if self.config.run_report:
+                self.metrics.write_json(self.config.run_report, report)
+            if self.config.prometheus_textfile:
+                self.metrics.write_prometheus(self.config.prometheus_textfile, report)
+        except OSError as e:
+            logger.warning(f"写入运行报告失败: {e}")
 
-            try:
-                existing_movie = self.notion_api.get_movie_by_douban_id(movie.id)
+    def _run_sync(self, movies: Optional[Iterable[DoubanMovie]] = None) -> Dict[str, Any]:
+        """按配置选择全量或增量同步，给定电影时直接全量同步这些电影"""
+        if movies is not None:
+            return self._full_sync(movies)
+        if self.config.incremental_sync and self.mirror:
+            logger.info("镜像模式需要完整的豆瓣列表，本次执行全量同步")
+        elif self.config.incremental_sync:
+            watermarks = {}
+            switched = self._database_switched()
+            if switched:
+                logger.info("Notion数据库已更换，忽略原有的增量水位线")
+            for status in self.sync_statuses:
+                watermarks[status] = Watermark() if switched else self.watermark_store.load(status) or Watermark()
+                if watermarks[status].rating_date or watermarks[status].ids:
+                    logger.info(
+                        f"{self._get_status_text(status)}增量水位线: "
+                        f"{watermarks[status].rating_date or '无日期'}，遇到已同步页面时停止抓取"
+                    )
+            douban_movies = self.iter_douban_movies(
+                stop_when={status: watermark.is_page_known for status, watermark in watermarks.items()}
+            )
+            return self._incremental_sync(douban_movies, watermarks)
+
+        return self._full_sync(self.iter_douban_movies())
+
+    def _database_switched(self) -> bool:
+        """本地状态是否记录了另一个Notion数据库，此时水位线和页面映射都不适用于当前数据库"""
+        recorded = self.state_store.get_meta("database_id")
+        return bool(recorded) and recorded != self.config.notion_database_id
+
+    def _start_checkpoint(self):
+        """恢复上次中断运行的检查点，或为本次运行开始新的检查点"""
+        self._checkpointing = True
+        previous = self.checkpoint.run_info() if self.resume else None
+        max_age = self.config.checkpoint_max_age * 3600
+        expired = bool(previous) and max_age > 0 and time.time() - previous.get("started_at", 0) > max_age
+        if (previous and not expired and previous.get("statuses") == self.sync_statuses
+                and previous.get("source") == self._source):
+            self._done = self.checkpoint.done()
+            self._resume_pages = {status: self.checkpoint.pages(status) for status in self.sync_statuses}
+            self._resume_totals = {status: self.checkpoint.total(status) for status in self.sync_statuses}
+            self._resumed = True
+            crawled = sum(len(movies) for _, movies in self._resume_pages.values())
+            logger.info(f"从检查点恢复: 已抓取{crawled}部电影，其中{len(self._done)}部已处理完成")
+            return
+
+        if expired:
+            logger.warning(f"检查点已超过{self.config.checkpoint_max_age:g}小时，豆瓣列表可能已变化，重新开始同步")
+        elif previous:
+            logger.warning("检查点的同步状态与当前配置不一致，重新开始同步")
+        elif self.resume:
+            logger.info("没有可恢复的检查点，重新开始同步")
+        self.checkpoint.start({"statuses": self.sync_statuses, "source": self._source})
+
+    def _skip_done(self, batch: List[DoubanMovie], stats: Dict[str, Any]) -> List[DoubanMovie]:
+        """从检查点恢复时跳过上次运行已处理完成的电影"""
+        if not self._done:
+            return batch
+        remaining = [movie for movie in batch if movie.id not in self._done]
+        stats["resumed"] = stats.get("resumed", 0) + len(batch) - len(remaining)
+        return remaining
 
-                if existing_movie:
-                    self.notion_api.update_movie_in_database(existing_movie["id"], movie)
-                    stats["updated"] += 1
-                    logger.info(f"✅ 更新电影: {movie.title}")
+    def plan_sync(self, movies: Optional[Iterable[DoubanMovie]] = None) -> Dict[str, Any]:
+        """
+        计划模式：执行与sync_movies相同的抓取和判断逻辑，但不写入Notion、本地状态和水位线
+
+        Args:
+            movies: 要同步的电影(可选)，见sync_movies
+
+        Returns:
+            计划报告，包含将新增、更新、跳过、归档的电影，预计的Notion请求数和耗时
+        """
+        self.planning = True
+        self.dry_run = True
+        self.plan = {"add": [], "update": [], "unchanged": [], "archive": []}
+
+        stats = self.sync_movies(movies)
+
+        lookup_requests = self.notion_api.request_count
+        write_requests = len(self.plan["add"]) + len(self.plan["update"]) + len(self.plan["archive"])
+        total_requests = lookup_requests + write_requests
+        rate = max(self.config.notion_rate_limit, 1e-6)
+
+        return {
+            "mode": "full" if self.mirror or movies is not None or not self.config.incremental_sync else "incremental",
+            "statuses": self.sync_statuses,
+            "mirror": self.mirror,
+            "counts": {
+                "total": stats["total"],
+                "add": len(self.plan["add"]),
+                "update": len(self.plan["update"]),
+                "unchanged": stats["total"] - len(self.plan["add"]) - len(self.plan["update"]),
+                "archive": len(self.plan["archive"]),
+            },
+            "requests": {
+                "lookup": lookup_requests,
+                "write": write_requests,
+                "total": total_requests,
+            },
+            "estimated_seconds": round(max(total_requests - self.config.notion_rate_burst, 0) / rate, 1),
+            "rate_limit": self.config.notion_rate_limit,
+            "movies": self.plan,
+        }
+
+    def export_snapshot(self, path: str) -> Dict[str, Any]:
+        """
+        只抓取豆瓣，把电影边抓取边写入JSONL快照，不访问Notion
+
+        有列表抓取不完整时快照保留为path.partial，不替换path
+
+        Returns:
+            统计信息，包含total、path(实际写入的文件)和(有列表抓取不完整时)incomplete
+        """
+        logger.info(f"开始抓取豆瓣电影并写入快照 {path}...")
+        total = write_snapshot(
+            self.iter_douban_movies(), path, is_complete=lambda: not self.douban_api.crawl_errors
+        )
+        stats = {"total": total, "path": path}
+        if self.douban_api.crawl_errors:
+            stats["incomplete"] = dict(self.douban_api.crawl_errors)
+            stats["path"] = f"{path}.partial"
+            for status, error in stats["incomplete"].items():
+                logger.warning(f"⚠️ {self._get_status_text(status)}列表抓取不完整，停在{error}")
+        logger.info(f"快照已写入 {stats['path']}，共{stats['total']}部电影")
+        return stats
+
+    def snapshot_movies(self, path: str, previous: Optional[str] = None,
+                        allow_incomplete: bool = False) -> Iterator[DoubanMovie]:
+        """
+        读取JSONL快照作为同步数据源，指定上一份快照时只同步新增或变化的电影
+
+        推送快照时不执行镜像归档：快照无法说明豆瓣列表是否完整抓取。
+        未完成的快照(.partial)默认拒绝推送，allow_incomplete为True时才推送
+        """
+        if is_partial_snapshot(path) and not allow_incomplete:
+            raise ValueError(f"快照 {path} 未完整抓取，如确需推送请使用--allow-incomplete")
+        self._source = os.path.abspath(path)
+        if self.mirror:
+            logger.warning("从快照推送时不执行镜像归档")
+            self.mirror = False
+        if previous is None:
+            return read_snapshot(path)
+
+        def diffed():
+            diff_stats = {}
+            yield from diff_snapshots(path, previous, diff_stats)
+            logger.info(
+                f"与上一份快照相比: 新增或变化{diff_stats['changed']}部，"
+                f"未变化{diff_stats['unchanged']}部，已移除{diff_stats['removed']}部"
+            )
+
+        return diffed()
+
+    def _plan_entry(self, movie: DoubanMovie, page_id: Optional[str] = None) -> Dict[str, Any]:
+        """计划报告中的单条记录"""
+        return {"douban_id": movie.id, "title": movie.title, "status": movie.status, "page_id": page_id}
+
+    def _new_stats(self) -> Dict[str, Any]:
+        """创建空的统计信息"""
+        return {"total": 0, "added": 0, "updated": 0, "unchanged": 0, "failed": 0}
+
+    def _full_sync(self, douban_movies: Iterable[DoubanMovie],
+                   stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """全量同步，内容未变化的电影跳过写入；镜像模式下随后归档豆瓣上已不存在的电影"""
+        stats = stats or self._new_stats()
+        self._prepare_lookup()
+        seen = set()
+
+        def plan_jobs():
+            for batch in self._batched(douban_movies):
+                stats["total"] += len(batch)
+                seen.update(movie.id for movie in batch)
+                batch = self._skip_done(batch, stats)
+                pages = self._lookup_pages(batch)
+                jobs = []
+                unchanged = []
+
+                with self.metrics.stage("diff"):
+                    for movie in batch:
+                        page = pages.get(movie.id)
+                        if not page:
+                            jobs.append((movie, None))
+                        elif self._is_unchanged(movie, page):
+                            unchanged.append((movie, page["id"]))
+                        else:
+                            jobs.append((movie, page["id"]))
+
+                self._provision_options(jobs)
+                yield from jobs
+                stats["unchanged"] += len(unchanged)
+                if self.planning:
+                    self.plan["unchanged"].extend(self._plan_entry(movie, page_id) for movie, page_id in unchanged)
                 else:
-                    self.notion_api.add_movie_to_database(movie)
-                    stats["added"] += 1
-                    logger.info(f"✅ 添加电影: {movie.title}")
+                    self.state_store.upsert_many(
+                        (movie.id, page_id, self.notion_api.payload_hash(movie), movie.status)
+                        for movie, page_id in unchanged
+                    )
+                    self.checkpoint.mark_done(movie.id for movie, _ in unchanged)
 
-            except Exception as e:
-                stats["failed"] += 1
-                logger.error(f"❌ 处理电影失败 {movie.title}: {e}")
+        self._execute_writes(plan_jobs(), stats)
 
-        self._log_stats(stats)
+        if self.mirror:
+            self._mirror(seen, stats)
+
+        self._finish_stats(stats)
         return stats
 
-    def _incremental_sync(self, douban_movies: List[DoubanMovie]) -> Dict[str, Any]:
-        """增量同步，只同步新增的电影"""
-        stats = {"total": len(douban_movies), "added": 0, "updated": 0, "failed": 0}
+    def _mirror(self, seen: Set[str], stats: Dict[str, Any]):
+        """
+        归档Notion中属于本次同步状态、但豆瓣列表里已不存在的电影页面
+
+        只在所有列表都完整抓取时执行，避免抓取中断导致误删；dry_run时只列出将被归档的页面
+        """
+        incomplete = [status for status in self.sync_statuses if not self.douban_api.crawl_complete.get(status)]
+        if incomplete or not seen:
+            logger.warning("豆瓣列表抓取不完整，跳过镜像归档")
+            return
+        if self._resumed:
+            # 检查点中的页面和之后按页码抓取的页面不是同一时刻的列表，中间被移除的条目会使后续页错位
+            logger.warning("本次从检查点恢复，豆瓣列表可能已在中断期间变化，跳过镜像归档，下次完整同步时执行")
+            return
+
+        for status in self.sync_statuses:
+            crawled = self._crawled.get(status, 0)
+            total = self.douban_api.crawl_totals.get(status)
+            if total is None and not crawled:
+                logger.warning(f"{self._get_status_text(status)}列表为空且无法确认条目总数，跳过镜像归档")
+                return
+            if total is not None and crawled < total:
+                logger.warning(
+                    f"{self._get_status_text(status)}列表只抓取到{crawled}部，豆瓣显示共{total}部"
+                    f"(可能受DOUBAN_MAX_PAGES限制)，跳过镜像归档"
+                )
+                return
+
+        orphans = self._find_orphans(seen)
+        stats["orphans"] = len(orphans)
+        stats["archived"] = 0
+        if not orphans:
+            logger.info("Notion中没有需要归档的电影")
+            return
+
+        if self.planning:
+            self.plan["archive"].extend(
+                {"douban_id": douban_id, "title": page["title"], "status": page["status"], "page_id": page["id"]}
+                for douban_id, page in orphans.items()
+            )
+        if self.dry_run:
+            logger.info(f"镜像试运行: 以下{len(orphans)}部电影已不在豆瓣列表中，实际运行时将被归档")
+            for douban_id, page in orphans.items():
+                logger.info(f"   {page['title'] or '(无标题)'} (豆瓣ID: {douban_id})")
+            return
+
+        logger.info(f"归档{len(orphans)}部已不在豆瓣列表中的电影...")
+        archived = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._archive_page, page["id"], douban_id): (douban_id, page)
+                for douban_id, page in orphans.items()
+            }
+            for future in futures:
+                douban_id, page = futures[future]
+                try:
+                    future.result()
+                    archived.append(douban_id)
+                    logger.info(f"🗑️ 归档电影: {page['title']}")
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.error(f"❌ 归档电影失败 {page['title']}: {e}")
+
+        stats["archived"] = len(archived)
+        self.state_store.delete(archived)
+
+    def _archive_page(self, page_id: str, douban_id: str):
+        with self.metrics.stage("write"):
+            self.notion_api.archive_page(page_id, douban_id)
+
+    def _find_orphans(self, seen: Set[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        找出状态属于本次同步范围、豆瓣ID不在seen中的页面
+
+        Returns:
+            豆瓣ID -> {"id": 页面ID, "title": 电影名称, "status": 状态}
+        """
+        index = self.notion_api.get_index() if self._use_index else self.notion_api.build_index()
+        status_names = {NotionAPI.STATUS_NAMES[status] for status in self.sync_statuses}
+
+        orphans = {}
+        for douban_id, page in index.items():
+            if douban_id in seen:
+                continue
+            properties = page.get("properties", {})
+            status_prop = properties.get("状态")
+            status_name = self.notion_api.canonical_value(status_prop) if status_prop else None
+            if status_name not in status_names:
+                continue
+            title_prop = properties.get("电影名称")
+            orphans[douban_id] = {
+                "id": page["id"],
+                "title": self.notion_api.canonical_value(title_prop) if title_prop else None,
+                "status": next(status for status, name in NotionAPI.STATUS_NAMES.items() if name == status_name)
+            }
+        return orphans
+
+    def _incremental_sync(self, douban_movies: Iterable[DoubanMovie],
+                          watermarks: Optional[Dict[str, Watermark]] = None) -> Dict[str, Any]:
+        """
+        增量同步，只同步新增的电影以及状态发生变化(如想看→已看)的电影，按批查询已存在的豆瓣ID
+
+        全部写入成功且对应列表抓取完整时推进并保存各状态的水位线，下次运行据此提前停止抓取
+        """
+        stats = self._new_stats()
+        movies = iter(douban_movies)
+        fallback = []
+        newest = {}
 
-        existing_ids = set()
         try:
-            results = self.notion_api.query_database()
-            for page in results:
-                douban_id_prop = page.get("properties", {}).get("豆瓣ID", {})
-                if douban_id_prop.get("type") == "rich_text":
-                    rich_text = douban_id_prop.get("rich_text", [])
-                    if rich_text:
-                        existing_ids.add(rich_text[0].get("text", {}).get("content", ""))
+            self._prepare_lookup()
         except Exception as e:
-            logger.warning(f"获取现有电影列表失败，将执行全量同步: {e}")
-            return self._full_sync(douban_movies)
+            logger.warning(f"校正本地同步状态失败，将继续使用现有状态: {e}")
 
-        for i, movie in enumerate(douban_movies):
-            if movie.id in existing_ids:
-                continue
+        def plan_jobs():
+            for batch in self._batched(movies):
+                for movie in batch:
+                    status_newest = newest.setdefault(movie.status, [])
+                    if len(status_newest) < self.douban_api.PAGE_SIZE:
+                        status_newest.append(movie)
+
+                remaining = self._skip_done(batch, stats)
+                try:
+                    pages = self._lookup_pages(remaining, properties=["豆瓣ID", "状态"])
+                except Exception as e:
+                    logger.warning(f"获取现有电影列表失败，将执行全量同步: {e}")
+                    stats["total"] += len(batch) - len(remaining)
+                    fallback.extend(remaining)
+                    return
+
+                stats["total"] += len(batch)
+                with self.metrics.stage("diff"):
+                    jobs = [
+                        (movie, pages[movie.id]["id"] if movie.id in pages else None)
+                        for movie in remaining
+                        if movie.id not in pages or self._status_changed(movie, pages[movie.id])
+                    ]
+                self._provision_options(jobs)
+                yield from jobs
+
+        self._execute_writes(plan_jobs(), stats)
+
+        if fallback:
+            return self._full_sync(itertools.chain(fallback, movies), stats)
+
+        if watermarks and stats["failed"] == 0 and not self.planning:
+            for status, status_newest in newest.items():
+                if status in watermarks and self.douban_api.crawl_complete.get(status):
+                    self.watermark_store.save(status, watermarks[status].advance(status_newest))
+
+        self._finish_stats(stats)
+        return stats
+
+    def _provision_options(self, jobs: List[Tuple[DoubanMovie, Optional[str]]]):
+        """
+        在写入一批电影之前补齐数据库中缺少的多选选项
+
+        抓取与写入是流水线，无法等全部抓取完再统一处理，因此按批进行；
+        地区等取值很少，通常只有第一批需要修改数据库结构
+        """
+        if self.planning or not jobs:
+            return
+        added = self.notion_api.ensure_select_options(movie for movie, _ in jobs)
+        if added:
+            logger.info(f"已向Notion数据库预先添加{added}个多选选项")
 
-            logger.info(f"正在处理第{stats['added']+1}部新电影: {movie.title}")
+    def _batched(self, movies: Iterable[DoubanMovie]) -> Iterator[List[DoubanMovie]]:
+        """按Notion过滤查询的批大小切分电影流"""
+        movies = iter(movies)
+        while True:
+            batch = list(itertools.islice(movies, self.notion_api.FILTER_BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
 
+    def _prepare_lookup(self):
+        """
+        决定本次运行如何查找已有页面
+
+        本地状态为空、指定了--reconcile、本地状态属于其他数据库(更换或重新创建了数据库)
+        或距上次校正过久时扫描一次Notion数据库，用扫描结果校正本地状态(计划模式下不修改)
+        并作为本次查找的依据；否则信任本地状态
+        """
+        database_id = self.config.notion_database_id
+        needs_scan = (
+            self.reconcile
+            or self.state_store.needs_reconcile(self.config.state_reconcile_days, database_id)
+            or not self.config.is_database_configured()
+        )
+        if not needs_scan:
+            self._use_index = False
+            return
+
+        logger.info("扫描Notion数据库以校正本地同步状态...")
+        with self.metrics.stage("notion_index"):
+            index = self.notion_api.build_index()
+        if not self.planning:
+            self.state_store.reconcile(
+                {douban_id: page["id"] for douban_id, page in index.items()},
+                database_id
+            )
+        self._use_index = True
+
+    def _lookup_pages(self, batch: List[DoubanMovie],
+                      properties: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        查找一批电影在Notion中的已有页面
+
+        优先使用本次扫描的索引或本地状态，其余的豆瓣ID按批向Notion过滤查询
+        """
+        with self.metrics.stage("notion_index"):
+            return self._find_pages(batch, properties)
+
+    def _find_pages(self, batch: List[DoubanMovie],
+                    properties: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        if self._use_index:
+            index = self.notion_api.get_index()
+            return {movie.id: index[movie.id] for movie in batch if movie.id in index}
+
+        pages = {}
+        unknown = []
+        for movie in batch:
+            entry = self.state_store.get(movie.id)
+            if entry:
+                pages[movie.id] = {
+                    "id": entry["page_id"],
+                    "payload_hash": entry["payload_hash"],
+                    "status": entry["status"]
+                }
+            else:
+                unknown.append(movie.id)
+
+        if unknown:
+            pages.update(self.notion_api.query_by_douban_ids(unknown, properties=properties))
+
+        return pages
+
+    def _is_unchanged(self, movie: DoubanMovie, page: Dict[str, Any]) -> bool:
+        """本地状态有哈希时直接比较哈希，否则与页面属性比较"""
+        if "properties" in page:
+            return not self.notion_api.has_changes(movie, page)
+        return page.get("payload_hash") == self.notion_api.payload_hash(movie)
+
+    def _status_changed(self, movie: DoubanMovie, page: Dict[str, Any]) -> bool:
+        """判断已有页面记录的观看状态是否与豆瓣不同"""
+        if "properties" in page:
+            status_prop = page["properties"].get("状态")
+            if not status_prop:
+                return False
+            return self.notion_api.canonical_value(status_prop) != NotionAPI.STATUS_NAMES.get(movie.status)
+        return bool(page.get("status")) and page["status"] != movie.status
+
+    def _execute_writes(self, jobs: Iterable[Tuple[DoubanMovie, Optional[str]]], stats: Dict[str, Any]):
+        """
+        使用线程池并发执行写入任务，请求速率由NotionAPI共享的令牌桶控制
+
+        在途任务数限制为线程数的两倍，写入跟不上时停止从上游取新任务，结果按输入顺序汇总；
+        计划模式下只记录将要执行的写入
+
+        Args:
+            jobs: (电影, 已存在页面ID) 序列，页面ID为None时新增页面
+            stats: 统计信息，只在当前线程中汇总以保证计数准确
+        """
+        if self.planning:
+            for movie, page_id in jobs:
+                action = "update" if page_id else "add"
+                self.plan[action].append(self._plan_entry(movie, page_id))
+                stats["updated" if page_id else "added"] += 1
+            return
+
+        for (movie, _), future in ordered_bounded_map(lambda job: self._write_movie(*job), jobs, self.max_workers):
             try:
-                self.notion_api.add_movie_to_database(movie)
-                stats["added"] += 1
-                logger.info(f"✅ 添加电影: {movie.title}")
+                action, page_id, payload_hash = future.result()
+                stats[action] += 1
+                self.state_store.upsert(movie.id, page_id, payload_hash, movie.status)
+                self.checkpoint.mark_done([movie.id])
+                action_text = "更新" if action == "updated" else "添加"
+                logger.info(f"✅ {action_text}电影: {movie.title}")
 
             except Exception as e:
                 stats["failed"] += 1
                 logger.error(f"❌ 处理电影失败 {movie.title}: {e}")
 
+    def _write_movie(self, movie: DoubanMovie, page_id: Optional[str]) -> Tuple[str, str, str]:
+        """
+        写入单部电影
+
+        本地状态记录的页面已被删除时改为新建页面
+
+        Returns:
+            (执行的操作added/updated, 页面ID, payload哈希)
+        """
+        with self.metrics.stage("write"):
+            return self._write_movie_page(movie, page_id)
+
+    def _write_movie_page(self, movie: DoubanMovie, page_id: Optional[str]) -> Tuple[str, str, str]:
+        payload_hash = self.notion_api.payload_hash(movie)
+
+        if page_id:
+            try:
+                page = self.notion_api.update_movie_in_database(page_id, movie)
+                return "updated", page["id"], payload_hash
+            except Exception as e:
+                if not self.notion_api.is_not_found(e):
+                    raise
+                logger.warning(f"页面已不存在，重新创建: {movie.title}")
+
+        page = self.notion_api.add_movie_to_database(movie)
+        return "added", page["id"], payload_hash
+
+    def _finish_stats(self, stats: Dict[str, Any]):
+        """汇总Notion和豆瓣的重试、豆瓣最终速率、抓取不完整的列表和HTTP缓存统计并输出日志"""
+        stats["retries"] = self.notion_api.retry_stats["retries"]
+        stats["retry_wait"] = round(self.notion_api.retry_stats["retry_wait"], 2)
+        stats["douban_retries"] = self.douban_api.retry_count
+        stats["douban_rate"] = round(self.douban_api.rate_limiter.rate, 2)
+        if self.douban_api.crawl_errors:
+            stats["incomplete"] = dict(self.douban_api.crawl_errors)
+        if self.douban_api.http_cache:
+            stats["http_cache_hit_rate"] = round(self.douban_api.http_cache.hit_rate(), 3)
         self._log_stats(stats)
-        return stats
 
     def _log_stats(self, stats: Dict[str, Any]):
         """记录同步统计信息"""
@@ -126,14 +770,21 @@ class SyncService:
         logger.info(f"总处理电影数: {stats['total']}")
         logger.info(f"新增电影数: {stats['added']}")
         logger.info(f"更新电影数: {stats['updated']}")
+        logger.info(f"未变化电影数: {stats.get('unchanged', 0)}")
         logger.info(f"失败电影数: {stats['failed']}")
+        logger.info(f"Notion重试次数: {stats.get('retries', 0)}")
+        logger.info(f"重试等待时间: {stats.get('retry_wait', 0)}秒")
+        if "resumed" in stats:
+            logger.info(f"检查点中已完成的电影数: {stats['resumed']}")
+        if "orphans" in stats:
+            logger.info(f"已不在豆瓣的电影数: {stats['orphans']}，已归档: {stats['archived']}")
+        logger.info(f"豆瓣重试次数: {stats.get('douban_retries', 0)}，最终请求速率: {stats.get('douban_rate')}次/秒")
+        for status, error in stats.get("incomplete", {}).items():
+            logger.warning(f"⚠️ {self._get_status_text(status)}列表抓取不完整，停在{error}")
+        if "http_cache_hit_rate" in stats:
+            logger.info(f"豆瓣HTTP缓存命中率: {stats['http_cache_hit_rate']:.1%}")
         logger.info("="*50)
 
-    def _get_status_text(self) -> str:
+    def _get_status_text(self, status: str) -> str:
         """获取同步状态的中文描述"""
-        status_mapping = {
-            "watched": "已看",
-            "wish": "想看",
-            "do": "在看"
-        }
-        return status_mapping.get(self.sync_status, "已看")
+        return NotionAPI.STATUS_NAMES.get(status, "已看")
@@ -0,0 +1,81 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+from .models import DoubanMovie
+
+
+class Watermark:
+    """增量同步水位线，记录上次成功同步时最新的评分日期和最近的豆瓣ID"""
+
+    MAX_IDS = 50
+
+    def __init__(self, rating_date: str = "", ids: Optional[Iterable[str]] = None):
+        self.rating_date = rating_date
+        self.ids = list(ids or [])
+        self._id_set = set(self.ids)
+
+    def is_page_known(self, movies: List[DoubanMovie]) -> bool:
+        """
+        判断一页电影是否都已同步过
+
+        豆瓣列表按标记时间倒序，某页中的电影全部是已知ID或早于水位线日期时，
+        后续页面也不会再有新电影
+        """
+        if not self.rating_date and not self.ids:
+            return False
+
+        return all(
+            movie.id in self._id_set
+            or (self.rating_date and movie.rating_date and movie.rating_date < self.rating_date)
+            for movie in movies
+        )
+
+    def advance(self, movies: List[DoubanMovie]) -> "Watermark":
+        """根据本次抓取到的最新电影生成新的水位线"""
+        dates = [movie.rating_date for movie in movies if movie.rating_date]
+        rating_date = max(dates + [self.rating_date]) if dates or self.rating_date else ""
+
+        ids = list(dict.fromkeys([movie.id for movie in movies] + self.ids))
+        return Watermark(rating_date, ids[:self.MAX_IDS])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """将水位线转换为字典"""
+        return {"rating_date": self.rating_date, "ids": self.ids}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Watermark":
+        """从字典创建水位线"""
+        return cls(data.get("rating_date", ""), data.get("ids", []))
+
+
+class WatermarkStore:
+    """水位线持久化，按同步状态分别保存在同一个JSON文件中"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, status: str) -> Optional[Watermark]:
+        """读取指定状态的水位线，文件不存在或损坏时返回None"""
+        data = self._read()
+        if status not in data:
+            return None
+        return Watermark.from_dict(data[status])
+
+    def save(self, status: str, watermark: Watermark):
+        """保存指定状态的水位线"""
+        data = self._read()
+        data[status] = watermark.to_dict()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _read(self) -> Dict[str, Any]:
+        """读取整个水位线文件"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
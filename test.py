@@ -53,9 +53,10 @@ def test_douban_connection():
 
     try:
         from src.douban_api import DoubanAPI
-        from src.config import config
+        from src.config import Config
 
-        api = DoubanAPI()
+        config = Config()
+        api = DoubanAPI(config)
         print(f"✅ 豆瓣用户名: {config.douban_user_id}")
 
         print("正在获取已看电影列表（前5部）...")
@@ -82,9 +83,10 @@ def test_notion_connection():
 
     try:
         from src.notion_api import NotionAPI
-        from src.config import config
+        from src.config import Config
 
-        api = NotionAPI()
+        config = Config()
+        api = NotionAPI(config)
 
         if config.is_database_configured():
             print(f"✅ 数据库ID: {config.notion_database_id[:8]}...")
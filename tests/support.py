@@ -0,0 +1,53 @@
+"""回归测试的公共工具：在本地启动模拟的豆瓣和Notion服务，创建指向它们的SyncService"""
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.fake_services import FakeDoubanServer, FakeNotionServer
+from src.config import Config
+from src.sync_service import SyncService
+
+
+class FakeServicesTestCase(unittest.TestCase):
+    """所有测试共用一组模拟服务，每个测试清空Notion数据库并使用独立的状态目录"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.douban = FakeDoubanServer().start()
+        cls.notion = FakeNotionServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.douban.stop()
+        cls.notion.stop()
+
+    def setUp(self):
+        self.notion.reset()
+        self.douban.interstitials.clear()
+        self.state_dir = tempfile.mkdtemp(prefix="douban_sync_test_")
+        self.addCleanup(shutil.rmtree, self.state_dir, ignore_errors=True)
+
+    def make_service(self, resume: bool = False, **env: str) -> SyncService:
+        """创建指向模拟服务的SyncService，重试不等待"""
+        base = dict(
+            DOUBAN_USER_ID="test",
+            NOTION_API_KEY="test",
+            NOTION_DATABASE_ID="fake-database",
+            STATE_DIR=self.state_dir,
+            HTTP_CACHE="false",
+            DOUBAN_RATE_LIMIT="500",
+            DOUBAN_MAX_RETRIES="2",
+            NOTION_RATE_LIMIT="500",
+            NOTION_RATE_BURST="50",
+        )
+        base.update(env)
+        service = SyncService(Config(base), resume=resume)
+        service.douban_api.BASE_URL = self.douban.url
+        service.douban_api.RETRY_BASE_DELAY = 0.001
+        service.notion_api.notion = service.notion_api._create_client(base_url=self.notion.url)
+        service.notion_api.RETRY_BASE_DELAY = 0.001
+        return service
+
+    def live_pages(self) -> int:
+        """Notion中未归档的页面数"""
+        return sum(1 for page in self.notion.pages.values() if not page.get("archived"))
@@ -0,0 +1,41 @@
+"""断点续传的回归测试：恢复的运行不执行镜像归档，过期的检查点不再恢复"""
+from tests.support import FakeServicesTestCase
+
+
+class ResumeTest(FakeServicesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.douban.populate({"watched": 60})
+        self.assertEqual(self.make_service().sync_movies()["added"], 60)
+
+        # 第3页被拦截，检查点保留前两页
+        self.douban.add_interstitial("watched", 2, 99)
+        stats = self.make_service().sync_movies()
+        self.assertIn("watched", stats["incomplete"])
+        self.assertIsNotNone(self.make_service().checkpoint.run_info())
+        self.douban.interstitials.clear()
+
+        # 中断期间有电影从列表中移除
+        del self.douban.lists["collect"][:5]
+
+    def test_resumed_run_skips_mirror(self):
+        stats = self.make_service(resume=True, MIRROR_MODE="true").sync_movies()
+
+        self.assertEqual(stats["resumed"], 30)
+        self.assertNotIn("incomplete", stats)
+        self.assertNotIn("archived", stats)
+        self.assertEqual(self.live_pages(), 60)
+
+        stats = self.make_service(MIRROR_MODE="true").sync_movies()
+        self.assertEqual(stats["archived"], 5)
+        self.assertEqual(self.live_pages(), 55)
+
+    def test_expired_checkpoint_restarts(self):
+        stats = self.make_service(resume=True, MIRROR_MODE="true", CHECKPOINT_MAX_AGE="0.000001").sync_movies()
+
+        self.assertNotIn("resumed", stats)
+        self.assertEqual(stats["total"], 55)
+        self.assertEqual(stats["archived"], 5)
+        self.assertEqual(self.live_pages(), 55)
+        self.assertIsNone(self.make_service().checkpoint.run_info())
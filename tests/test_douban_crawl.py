@@ -0,0 +1,69 @@
+"""豆瓣列表抓取的回归测试：验证码/封禁页面和空页面按限流重试，重试失败时列表标记为抓取不完整"""
+from tests.support import FakeServicesTestCase
+
+
+class BlockedPageTest(FakeServicesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.douban.populate({"watched": 60})
+
+    def block_empty_grid(self, start: int):
+        """让指定偏移的列表页返回有列表标记、但没有条目的页面"""
+        render_page = self.douban.render_page
+        self.douban.render_page = lambda ids, page_start: render_page(ids if page_start != start else [], page_start)
+        self.addCleanup(setattr, self.douban, "render_page", render_page)
+
+    def test_transient_block_is_retried(self):
+        self.douban.add_interstitial("watched", 2, 1)
+
+        stats = self.make_service().sync_movies()
+
+        self.assertNotIn("incomplete", stats)
+        self.assertEqual(stats["added"], 60)
+        self.assertGreaterEqual(stats["douban_retries"], 1)
+
+    def test_blocked_first_page_is_incomplete(self):
+        self.douban.add_interstitial("watched", 0, 99)
+        service = self.make_service(INCREMENTAL_SYNC="true")
+
+        stats = service.sync_movies()
+
+        self.assertIn("第1页", stats["incomplete"]["watched"])
+        self.assertEqual(stats["total"], 0)
+        self.assertIsNotNone(service.checkpoint.run_info())
+        self.assertIsNone(service.watermark_store.load("watched"))
+
+    def test_blocked_first_page_of_resumed_run_is_incomplete(self):
+        self.douban.add_interstitial("watched", 2, 99)
+        stats = self.make_service(INCREMENTAL_SYNC="true").sync_movies()
+        self.assertIn("第3页", stats["incomplete"]["watched"])
+
+        # 恢复时从第3页开始，该页仍被拦截
+        service = self.make_service(resume=True, INCREMENTAL_SYNC="true")
+        stats = service.sync_movies()
+
+        self.assertIn("第3页", stats["incomplete"]["watched"])
+        self.assertIsNotNone(service.checkpoint.run_info())
+        self.assertIsNone(service.watermark_store.load("watched"))
+
+        self.douban.interstitials.clear()
+        service = self.make_service(resume=True, INCREMENTAL_SYNC="true")
+        stats = service.sync_movies()
+
+        self.assertNotIn("incomplete", stats)
+        self.assertEqual(stats["resumed"], 30)
+        self.assertEqual(self.live_pages(), 60)
+        self.assertIsNone(service.checkpoint.run_info())
+        self.assertIsNotNone(service.watermark_store.load("watched"))
+
+    def test_empty_page_within_resumed_total_is_incomplete(self):
+        self.douban.add_interstitial("watched", 2, 99)
+        self.make_service().sync_movies()
+        self.douban.interstitials.clear()
+
+        # 恢复时第3页有列表标记但没有条目：按检查点记录的总数这一页本应有电影
+        self.block_empty_grid(30)
+        stats = self.make_service(resume=True).sync_movies()
+
+        self.assertIn("第3页", stats["incomplete"]["watched"])
@@ -0,0 +1,35 @@
+"""镜像模式的回归测试：只有完整抓取了豆瓣列表时才归档Notion中多出的页面"""
+from tests.support import FakeServicesTestCase
+
+
+class MirrorTest(FakeServicesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.douban.populate({"watched": 60})
+        self.assertEqual(self.make_service().sync_movies()["added"], 60)
+
+    def test_removed_movies_are_archived_after_complete_crawl(self):
+        self.douban.lists["collect"] = self.douban.lists["collect"][:50]
+
+        stats = self.make_service(MIRROR_MODE="true").sync_movies()
+
+        self.assertEqual(stats["orphans"], 10)
+        self.assertEqual(stats["archived"], 10)
+        self.assertEqual(self.live_pages(), 50)
+
+    def test_incomplete_crawl_does_not_archive(self):
+        self.douban.add_interstitial("watched", 2, 99)
+
+        stats = self.make_service(MIRROR_MODE="true").sync_movies()
+
+        self.assertIn("watched", stats["incomplete"])
+        self.assertNotIn("archived", stats)
+        self.assertEqual(self.live_pages(), 60)
+
+    def test_max_pages_cap_does_not_archive(self):
+        stats = self.make_service(MIRROR_MODE="true", DOUBAN_MAX_PAGES="2").sync_movies()
+
+        self.assertEqual(stats["total"], 30)
+        self.assertNotIn("archived", stats)
+        self.assertEqual(self.live_pages(), 60)